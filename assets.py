@@ -0,0 +1,176 @@
+##### ASSETS #####
+# Every asset is loaded on first use and cached, so importing a module never touches the disk or the mixer.
+# Images are cached by (file, size or scale), converted to the display format once and small sprites share one atlas.
+import os, sys
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import time
+import pygame
+from settings import CHARACTER_WIDTH, CHARACTER_HEIGHT, FONT
+
+# Sprites that are blitted every frame, packed into a single surface the first time one of them is needed
+ATLAS_SPRITES = (("character.png", (CHARACTER_WIDTH, CHARACTER_HEIGHT)),
+                 ("shadow.png", (CHARACTER_WIDTH, CHARACTER_HEIGHT)))
+ATLAS_WIDTH = 256
+
+##### FUNCTION TO ACCESS ASSETS #####
+def get_asset_path(filename):
+    if getattr(sys, "frozen", False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(__file__)
+    return os.path.join(base_path, "assets", filename)
+
+def get_audio_path(name):
+    ### The browser build only ships decoders for OGG
+    if sys.platform == "emscripten":
+        return get_asset_path(f"{name}.ogg")
+    return get_asset_path(f"{name}.mp3")
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+def sound_bytes(sound):
+    ### Size of the decoded samples, from the mixer's output format
+    frequency, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * channels * abs(size) // 8
+
+class AssetManager:
+    def __init__(self, atlas_sprites=ATLAS_SPRITES):
+        self.images = {} # (filename, size, scale) -> surface
+        self.sounds = {}
+        self.fonts = {}
+        self.texts = {}
+        self.music_loaded = False
+        self.atlas_sprites = atlas_sprites
+        self.atlas = None
+        self.stats = {} # asset name -> (load seconds, resident bytes)
+
+    def record(self, name, start, size):
+        self.stats[name] = (time.perf_counter() - start, size)
+
+    def to_display_format(self, surface):
+        ### Convert once to the window's pixel format so blits don't convert every frame (no-op before a window exists)
+        if pygame.display.get_surface() is None:
+            return surface
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def load_image(self, filename, size=None, scale=None):
+        ### Load an image once, optionally scaled to (width, height) or by a factor; only the requested variant is cached
+        key = (filename, size, scale)
+        if key not in self.images:
+            if self.atlas is None and (filename, size) in self.atlas_sprites and scale is None:
+                self.build_atlas()
+                return self.images[key]
+            start = time.perf_counter()
+            image = self.images.get((filename, None, None)) or pygame.image.load(get_asset_path(filename))
+            if scale is not None:
+                size = (int(image.get_width() * scale), int(image.get_height() * scale))
+            if size is not None:
+                image = pygame.transform.scale(image, size)
+            self.images[key] = self.to_display_format(image)
+            self.record(f"{filename} {size[0]}x{size[1]}" if size else filename, start, surface_bytes(self.images[key]))
+        return self.images[key]
+
+    def build_atlas(self):
+        ### Pack the atlas sprites into shelves of one surface and cache a subsurface for each of them
+        start = time.perf_counter()
+        images = [(key, pygame.transform.scale(pygame.image.load(get_asset_path(key[0])), key[1]))
+                  for key in self.atlas_sprites]
+        positions = []
+        x = y = shelf_height = 0
+        for key, image in images:
+            width, height = image.get_size()
+            if x + width > ATLAS_WIDTH:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            positions.append((x, y))
+            x += width
+            shelf_height = max(shelf_height, height)
+        width = max(px + image.get_width() for (px, py), (key, image) in zip(positions, images))
+        height = max(py + image.get_height() for (px, py), (key, image) in zip(positions, images))
+
+        self.atlas = self.to_display_format(pygame.Surface((width, height), pygame.SRCALPHA))
+        self.atlas.fill((0, 0, 0, 0))
+        for (px, py), (key, image) in zip(positions, images):
+            self.atlas.blit(image, (px, py))
+            self.images[key + (None,)] = self.atlas.subsurface((px, py, image.get_width(), image.get_height()))
+        self.record(f"atlas ({len(images)} sprites)", start, surface_bytes(self.atlas))
+
+    def load_sound(self, name):
+        ### Decode a sound effect once, on first use
+        if name not in self.sounds:
+            start = time.perf_counter()
+            self.sounds[name] = pygame.mixer.Sound(get_audio_path(name))
+            self.record(name, start, sound_bytes(self.sounds[name]))
+        return self.sounds[name]
+
+    def play_sound(self, name, loops=0):
+        ### Play a sound effect, decoding it the first time it is played
+        sound = self.load_sound(name)
+        sound.play(loops)
+        return sound
+
+    def play_music(self):
+        ### Stream the background music, loading it the first time it is played
+        if not self.music_loaded:
+            start = time.perf_counter()
+            pygame.mixer.music.load(get_audio_path("music/background2"))
+            self.record("music/background2 (streamed)", start, 0)
+            self.music_loaded = True
+        pygame.mixer.music.play(-1)
+
+    def get_font(self, size):
+        ### Load the bundled game font once per size (a file path, so the system fonts are never scanned)
+        if size not in self.fonts:
+            start = time.perf_counter()
+            self.fonts[size] = pygame.font.Font(get_asset_path(f"fonts/{FONT}") if FONT is not None else None, size)
+            self.record(f"font {size}pt", start, 0)
+        return self.fonts[size]
+
+    def render_text(self, text, size, color):
+        ### Render a line of text (or a single glyph) once, static screens and the HUD blit the cached surface instead
+        key = (text, size, color)
+        if key not in self.texts:
+            self.texts[key] = self.get_font(size).render(text, True, color)
+        return self.texts[key]
+
+    def report(self):
+        ### Loaded assets as (name, load seconds, resident bytes), largest first
+        rows = [(name, seconds, size) for name, (seconds, size) in self.stats.items()]
+        rows.append(("text cache", 0.0, sum(surface_bytes(text) for text in self.texts.values())))
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def print_report(self):
+        rows = self.report()
+        for name, seconds, size in rows:
+            print(f"{name:<40} {seconds * 1000:8.2f}ms {size / 1024:10.1f} KiB")
+        print(f"{'total':<40} {sum(row[1] for row in rows) * 1000:8.2f}ms {sum(row[2] for row in rows) / 1024:10.1f} KiB")
+
+# The game shares one manager, these are its methods under the names the rest of the code uses
+manager = AssetManager()
+load_image = manager.load_image
+load_sound = manager.load_sound
+play_sound = manager.play_sound
+play_music = manager.play_music
+get_font = manager.get_font
+render_text = manager.render_text
+
+if __name__ == "__main__":
+    # Load every asset the game uses and report load times and memory
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    for filename, size in ATLAS_SPRITES:
+        load_image(filename, size)
+    load_image("shadow.png")
+    for name in ("resume", "restart", "quit"):
+        for style in ("button", "col_button"):
+            load_image(f"buttons/{name}_{style}.png", scale=0.5)
+    if pygame.mixer.get_init():
+        load_sound("sounds/monster_growl")
+        load_sound("music/pause_menu")
+        play_music()
+    for size in (16, 24, 48, 96):
+        get_font(size)
+    manager.print_report()
+    pygame.quit()
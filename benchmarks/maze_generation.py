@@ -0,0 +1,35 @@
+##### MAZE GENERATION MICROBENCHMARK #####
+# Reports sections/second for each maze generator at the given grid sizes.
+# Usage: python benchmarks/maze_generation.py [--sizes 15 301] [--seconds 2] [--generators flat classic] [--seed 0]
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import argparse
+import time
+from maze import MazeManager
+from settings import GRID_SIZE
+
+def bench(generator, size, seconds, seed):
+    ### Generate sections for roughly the given number of seconds and return sections/second
+    maze_manager = MazeManager(size * GRID_SIZE, size * GRID_SIZE, generator, seed)
+    section = 2
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds or section == 2:
+        maze_manager.generate_maze_section(section)
+        section += 1
+        elapsed = time.perf_counter() - start
+    return (section - 2) / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maze generation microbenchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[15, 301], help="grid sizes (cells per side)")
+    parser.add_argument("--seconds", type=float, default=2, help="time budget per generator and size")
+    parser.add_argument("--generators", nargs="+", default=["flat", "classic"])
+    parser.add_argument("--seed", type=int, default=0, help="maze seed, so runs generate the same sections")
+    args = parser.parse_args()
+
+    print(f"{'generator':<10} {'size':>9} {'sections/s':>12}")
+    for size in args.sizes:
+        for generator in args.generators:
+            rate = bench(generator, size, args.seconds, args.seed)
+            print(f"{generator:<10} {f'{size}x{size}':>9} {rate:>12.1f}")
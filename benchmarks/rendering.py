@@ -0,0 +1,77 @@
+##### RENDERING BENCHMARK #####
+# Reports draw time per frame of each renderer while the camera climbs through the maze, for several grid sizes.
+# Every configuration runs in a fresh process because GRID_SIZE and the window size are read at import time.
+# Usage: python benchmarks/rendering.py [--grid-sizes 50 10 5] [--window 750] [--renderers full dirty numpy] [--frames 600]
+import os, sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import argparse
+import json
+import subprocess
+import time
+
+def run_child(grid_size, window, renderer_name, frames, seed):
+    ### Climb for the given number of frames with one renderer and print the draw times as JSON
+    import settings
+    settings.GRID_SIZE = grid_size
+    settings.CHARACTER_WIDTH = settings.CHARACTER_HEIGHT = grid_size
+    settings.GRID_LINES = grid_size >= 4
+    settings.WIDTH = settings.HEIGHT = window
+    settings.WINDOWSIZE = (window, window)
+
+    import pygame
+    from maze import MazeManager
+    from gameplay import GameState
+    from rendering import RENDERERS
+    from main import update_camera
+
+    pygame.display.init()
+    surface = pygame.display.set_mode((window, window))
+    maze_manager = MazeManager(window, window, seed=seed)
+    state = GameState(maze_manager)
+    renderer = RENDERERS[renderer_name]()
+
+    # The player is moved straight up (through walls) at a quarter cell per frame so the camera keeps scrolling
+    camera_y = state.player_y - window // 2
+    draw_times = []
+    for frame in range(frames):
+        state.player_y -= max(1, grid_size // 4)
+        maze_manager.update_sections(state.player_y)
+        camera_y = update_camera(camera_y, state.player_y, 1 / 60)
+        start = time.perf_counter()
+        changed = renderer.draw(surface, maze_manager, state, camera_y)
+        if changed is None:
+            pygame.display.flip()
+        elif changed:
+            pygame.display.update(changed)
+        draw_times.append(time.perf_counter() - start)
+    print(json.dumps(draw_times))
+    pygame.quit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renderer benchmark")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[50, 10, 5], help="pixels per cell")
+    parser.add_argument("--window", type=int, default=750, help="window width and height in pixels")
+    parser.add_argument("--renderers", nargs="+", default=["full", "dirty", "numpy"])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0, help="maze seed, so every renderer draws the same maze")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        grid_size, window, renderer_name = args.child
+        run_child(int(grid_size), int(window), renderer_name, args.frames, args.seed)
+        sys.exit()
+
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    print(f"{'grid':>5} {'window':>7} {'renderer':<9} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for grid_size in args.grid_sizes:
+        for renderer_name in args.renderers:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), "--frames", str(args.frames),
+                                     "--seed", str(args.seed), "--child", str(grid_size), str(args.window), renderer_name],
+                                    env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            times = sorted(t * 1000 for t in json.loads(output.strip().splitlines()[-1]))
+            print(f"{grid_size:>5} {args.window:>7} {renderer_name:<9} {sum(times) / len(times):>7.2f}ms "
+                  f"{times[len(times) // 2]:>7.2f}ms {times[int(len(times) * 0.95)]:>7.2f}ms {times[-1]:>7.2f}ms")
@@ -0,0 +1,60 @@
+##### SHADOW SCALING BENCHMARK #####
+# Reports the simulation time per tick (shadow replay and collision) and the draw time per frame for growing
+# shadow counts, so a multi-shadow mode can be checked to keep frame time flat.
+# Usage: python benchmarks/shadows.py [--counts 1 10 100 500] [--ticks 3000] [--renderer dirty] [--seed 0]
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import argparse
+import random
+import time
+import pygame
+from maze import MazeManager
+from gameplay import GameState, DIRECTIONS
+from rendering import RENDERERS
+from main import update_camera
+from settings import WINDOWSIZE, TICK_RATE
+
+def bench(window, count, ticks, renderer_name, seed, spacing=0.05):
+    ### Walk randomly for the given ticks with count shadows, returns (simulation, draw) seconds per tick
+    maze_manager = MazeManager(*WINDOWSIZE, seed=seed)
+    state = GameState(maze_manager, shadow_delay_init=3)
+    for index in range(1, count):
+        state.shadows.spawn(index * spacing)
+    renderer = RENDERERS[renderer_name]()
+    rng = random.Random(seed)
+    tick = 1 / TICK_RATE
+    camera_y = state.player_y - WINDOWSIZE[1] // 2
+    simulation = draw = 0
+    for frame in range(1, ticks + 1):
+        start = time.perf_counter()
+        if frame % 8 == 0:
+            state.move(*rng.choice(DIRECTIONS), frame * tick)
+        state.update(frame * tick) # collisions are counted, the walk carries on either way
+        camera_y = update_camera(camera_y, state.player_y, tick)
+        middle = time.perf_counter()
+        changed = renderer.draw(window, maze_manager, state, camera_y)
+        if changed is None:
+            pygame.display.flip()
+        elif changed:
+            pygame.display.update(changed)
+        end = time.perf_counter()
+        simulation += middle - start
+        draw += end - middle
+    return simulation / ticks, draw / ticks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shadow count scaling benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100, 500], help="shadow counts")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--renderer", default="dirty", choices=sorted(RENDERERS))
+    parser.add_argument("--seed", type=int, default=0, help="maze and walk seed, so every count plays the same run")
+    args = parser.parse_args()
+
+    pygame.display.init()
+    window = pygame.display.set_mode(WINDOWSIZE)
+    print(f"{'shadows':>8} {'simulation':>12} {'draw':>10}")
+    for count in args.counts:
+        simulation, draw = bench(window, count, args.ticks, args.renderer, args.seed)
+        print(f"{count:>8} {simulation * 1000:>10.3f}ms {draw * 1000:>8.3f}ms")
+    pygame.quit()
@@ -0,0 +1,179 @@
+##### SOAK BENCHMARK #####
+# Drives MazeManager and GameState's movement/shadow logic through millions of scripted moves and checks that memory stays
+# bounded and moves don't get slower. Every pattern runs in a fresh process, so RSS is measured per pattern.
+# Samples record RSS, Python allocations (tracemalloc), resident/stored sections, pending moves and per-move latency.
+# Exits with status 1 if any pattern fails a check.
+# Usage: python benchmarks/soak.py [--patterns up down zigzag pingpong] [--moves 1000000] [--samples 20]
+#                                  [--prefetch 1] [--no-tracemalloc] [--output soak.jsonl]
+import os, sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import argparse
+import json
+import subprocess
+import time
+from settings import GRID_SIZE
+
+PATTERNS = ("up", "down", "zigzag", "pingpong")
+WARMUP = 0.1 # share of the run before the baseline sample is taken
+INDEX_BYTES_PER_SECTION = 256 # Python memory the section store's index may take per stored section
+HEAP_SLACK = 1 << 20
+RSS_SLACK = 16 << 20
+MAX_PENDING_MOVES = 4096
+
+def get_rss():
+    ### Current resident set size in bytes (peak RSS where /proc is not available)
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def pattern_moves(pattern, section_height, max_sections):
+    ### Endless (dx, dy) cell moves: straight up or down, up three sections and down two, or back and forth across
+    ### more sections than stay resident so they keep going through the section store. dx wiggles the player sideways.
+    if pattern == "up":
+        legs = ((-1, 1),)
+    elif pattern == "down":
+        legs = ((1, 1),)
+    elif pattern == "zigzag":
+        legs = ((-1, 3 * section_height), (1, 2 * section_height))
+    else:
+        legs = ((-1, (max_sections + 2) * section_height), (1, (max_sections + 2) * section_height))
+    dx = 1
+    while True:
+        for dy, length in legs:
+            for _ in range(length):
+                yield dx, 0
+                yield 0, dy
+                dx = -dx
+
+def walk(state, dx, dy, current_time):
+    ### Open the target cell in its (always resident, at most one section away) grid, then make the real move,
+    ### so a scripted pattern can cover any distance through GameState.move
+    maze_manager = state.maze_manager
+    grid_x = (state.player_x + dx * state.player_speed) // GRID_SIZE
+    grid_y = (state.player_y + dy * state.player_speed) // GRID_SIZE
+    maze_manager.maze_sections[grid_y // maze_manager.section_height][grid_y % maze_manager.section_height, grid_x] = 0
+    if not state.move(dx, dy, current_time):
+        raise RuntimeError(f"scripted move ({dx}, {dy}) was blocked")
+
+def run_child(pattern, moves, samples, prefetch, trace, seed):
+    ### Run one pattern and print a JSON line per sample, then a summary line with the failed checks
+    import tracemalloc
+    import numpy as np
+    from maze import MazeManager
+    from gameplay import GameState
+    from settings import WIDTH, HEIGHT, TICK_RATE, GENERATION_BUDGET
+
+    if trace:
+        tracemalloc.start()
+    maze_manager = MazeManager(WIDTH, HEIGHT, seed=seed, prefetch=prefetch)
+    state = GameState(maze_manager)
+    tick = 1 / TICK_RATE
+    ticks_per_move = 4 # a move every 4 ticks, 30 moves per second of game time
+
+    window = max(1, moves // samples)
+    latencies = np.empty(window, dtype=np.float64)
+    history = []
+    steps = pattern_moves(pattern, maze_manager.section_height, maze_manager.max_sections)
+    for move in range(1, moves + 1):
+        dx, dy = next(steps)
+        current_time = move * ticks_per_move * tick
+        start = time.perf_counter()
+        walk(state, dx, dy, current_time)
+        state.update(current_time) # the shadow may catch the player, the walk carries on regardless
+        if prefetch:
+            maze_manager.advance_generation(GENERATION_BUDGET)
+        latencies[(move - 1) % window] = time.perf_counter() - start
+
+        if move % window == 0:
+            stats = maze_manager.memory_stats()
+            sample = {
+                "moves": move,
+                "rss": get_rss(),
+                "heap": tracemalloc.get_traced_memory()[0] if trace else 0,
+                "resident_sections": stats["resident_sections"],
+                "stored_sections": stats["stored_sections"],
+                "store_bytes": stats["file_bytes"],
+                "pending_moves": len(state.movement_history),
+                "jobs": len(maze_manager.jobs) + len(maze_manager.prefetched),
+                "p50_us": float(np.percentile(latencies, 50)) * 1e6,
+                "p99_us": float(np.percentile(latencies, 99)) * 1e6,
+                "max_us": float(latencies.max()) * 1e6,
+            }
+            history.append(sample)
+            print(json.dumps(sample), flush=True)
+
+    # Checks against the first sample after the warm-up, never the first one (taken before one-time allocations)
+    baseline = history[min(len(history) - 1, max(1, int(len(history) * WARMUP)))]
+    final = history[-1]
+    new_sections = final["stored_sections"] - baseline["stored_sections"]
+    failures = []
+    if max(sample["resident_sections"] for sample in history) > maze_manager.max_sections:
+        failures.append("more sections resident than max_sections")
+    if max(sample["pending_moves"] for sample in history) > MAX_PENDING_MOVES:
+        failures.append("movement history kept growing")
+    if max(sample["jobs"] for sample in history) > 2 * prefetch:
+        failures.append("pre-generation queue kept growing")
+    heap_limit = baseline["heap"] + new_sections * INDEX_BYTES_PER_SECTION + HEAP_SLACK
+    if trace and final["heap"] > heap_limit:
+        failures.append(f"Python heap grew to {final['heap'] / 1024:.0f} KiB (limit {heap_limit / 1024:.0f} KiB)")
+    rss_limit = baseline["rss"] + final["store_bytes"] - baseline["store_bytes"] + new_sections * INDEX_BYTES_PER_SECTION + RSS_SLACK
+    if final["rss"] > rss_limit:
+        failures.append(f"RSS grew to {final['rss'] >> 20} MiB (limit {rss_limit >> 20} MiB)")
+    if final["p50_us"] > 2 * max(baseline["p50_us"], 1):
+        failures.append(f"median move slowed from {baseline['p50_us']:.1f}us to {final['p50_us']:.1f}us")
+    print(json.dumps({"pattern": pattern, "failures": failures}))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-session soak benchmark")
+    parser.add_argument("--patterns", nargs="+", default=list(PATTERNS), choices=PATTERNS)
+    parser.add_argument("--moves", type=int, default=1000000, help="moves per pattern")
+    parser.add_argument("--samples", type=int, default=20, help="samples per pattern")
+    parser.add_argument("--prefetch", type=int, default=1, help="PREFETCH_SECTIONS for the soaked MazeManager")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip Python allocation tracing (runs about twice as fast)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write every sample as JSON lines, to compare releases")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.moves, args.samples, args.prefetch, not args.no_tracemalloc, args.seed)
+        sys.exit()
+
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    output = open(args.output, "w") if args.output else None
+    failed = False
+    for pattern in args.patterns:
+        command = [sys.executable, os.path.abspath(__file__), "--child", pattern, "--moves", str(args.moves),
+                   "--samples", str(args.samples), "--prefetch", str(args.prefetch), "--seed", str(args.seed)]
+        if args.no_tracemalloc:
+            command.append("--no-tracemalloc")
+        start = time.perf_counter()
+        lines = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+        rows = [json.loads(line) for line in lines.splitlines() if line.startswith("{")]
+        samples, summary = rows[:-1], rows[-1]
+
+        print(f"{pattern}: {args.moves} moves in {elapsed:.1f}s")
+        print(f"{'moves':>9} {'RSS MiB':>8} {'heap KiB':>9} {'resident':>9} {'stored':>7} {'pending':>8} "
+              f"{'p50 us':>8} {'p99 us':>8} {'max us':>9}")
+        for sample in samples:
+            print(f"{sample['moves']:>9} {sample['rss'] / 2**20:>8.1f} {sample['heap'] / 1024:>9.0f} "
+                  f"{sample['resident_sections']:>9} {sample['stored_sections']:>7} {sample['pending_moves']:>8} "
+                  f"{sample['p50_us']:>8.1f} {sample['p99_us']:>8.1f} {sample['max_us']:>9.0f}")
+            if output:
+                output.write(json.dumps({"pattern": pattern, **sample}) + "\n")
+        for failure in summary["failures"]:
+            print(f"FAIL {pattern}: {failure}")
+        print("ok" if not summary["failures"] else "FAILED")
+        print()
+        failed |= bool(summary["failures"])
+    if output:
+        output.close()
+    sys.exit(1 if failed else 0)
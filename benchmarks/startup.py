@@ -0,0 +1,67 @@
+##### STARTUP BENCHMARK #####
+# Reports time-to-first-frame of a cold start, broken down by phase.
+# Every run is a fresh Python process, so imports and asset decoding are measured cold.
+# Usage: python benchmarks/startup.py [--runs 5] [--headless]
+import os, sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+
+def run_child():
+    ### Start the game, stop it right after the first frame and print the phase timings as JSON
+    start = time.perf_counter()
+    import main
+    import pygame
+    import_time = time.perf_counter() - start
+
+    app = main.App()
+
+    async def quit_after_first_frame():
+        while not app.started:
+            await asyncio.sleep(0)
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    async def run():
+        watcher = asyncio.ensure_future(quit_after_first_frame())
+        await main.main(app, 1)
+        watcher.cancel()
+
+    sys.stdout = open(os.devnull, "w") # the game prints its own status lines
+    asyncio.run(run())
+    sys.stdout = sys.__stdout__
+    print(json.dumps({"import": import_time, **app.startup_timings}))
+    pygame.quit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--headless", action="store_true", help="use SDL's dummy video and audio drivers")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        sys.exit()
+
+    env = dict(os.environ)
+    if args.headless:
+        env["SDL_VIDEODRIVER"] = "dummy"
+        env["SDL_AUDIODRIVER"] = "dummy"
+
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'phase':<14} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for phase in runs[0]:
+        times = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<14} {statistics.median(times):>10.1f} {min(times):>8.1f} {max(times):>8.1f}")
+    totals = [sum(run.values()) * 1000 for run in runs]
+    print(f"{'total':<14} {statistics.median(totals):>10.1f} ms to first frame (median of {len(runs)} runs)")
@@ -2,34 +2,66 @@ import pygame
 
 class Button:
     def __init__(self, x_pos, y_pos, texture, scale_factor):
-        # Rescale the image
-        original_width, original_height = texture.get_width(), texture.get_height()
-        self.texture = pygame.transform.scale(texture, (int(original_width * scale_factor), int(original_height * scale_factor)))
-        
+        # Rescale the image (textures from assets.load_image(..., scale=...) are already the right size)
+        if scale_factor == 1:
+            self.texture = texture
+        else:
+            original_width, original_height = texture.get_width(), texture.get_height()
+            self.texture = pygame.transform.scale(texture, (int(original_width * scale_factor), int(original_height * scale_factor)))
+
+        # Lighter and darker copies for the hovered and pressed states, built once
+        self.hover_texture = self.texture.copy()
+        self.hover_texture.fill((40, 40, 40), special_flags=pygame.BLEND_RGB_ADD)
+        self.pressed_texture = self.texture.copy()
+        self.pressed_texture.fill((40, 40, 40), special_flags=pygame.BLEND_RGB_SUB)
+
         # Set the button's position using its center
         self.area = self.texture.get_rect(center=(x_pos, y_pos))
-        
-        # Track the button's clicked state
+
+        # Track the button's hover and clicked state, the button is redrawn only when they change
+        self.is_hovered = False
         self.is_pressed = False
+        self.dirty = True
 
-    def render(self, screen):
+    def reset(self, mouse_pos):
+        ### Forget any press and pick up the hover state when the screen holding the button is shown
+        self.is_hovered = self.area.collidepoint(mouse_pos)
+        self.is_pressed = False
+        self.dirty = True
+
+    def handle_event(self, event):
+        ### Hit-test one mouse event, returns True when the button was clicked (pressed and released on it)
         action_triggered = False
-        
-        # Get the current position of the mouse
-        mouse_pos = pygame.mouse.get_pos()
+        hovered, pressed = self.is_hovered, self.is_pressed
 
-        # Check if the mouse is hovering over the button
-        if self.area.collidepoint(mouse_pos):
-            # Check for a mouse click (left button)
-            if pygame.mouse.get_pressed()[0] == 1 and not self.is_pressed:
-                self.is_pressed = True
-                action_triggered = True
+        if event.type == pygame.MOUSEMOTION:
+            hovered = self.area.collidepoint(event.pos)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            hovered = self.area.collidepoint(event.pos)
+            pressed = hovered
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            hovered = self.area.collidepoint(event.pos)
+            action_triggered = pressed and hovered
+            pressed = False
 
-        # Reset the click state when the mouse button is released
-        if pygame.mouse.get_pressed()[0] == 0:
-            self.is_pressed = False
+        if (hovered, pressed) != (self.is_hovered, self.is_pressed):
+            self.is_hovered, self.is_pressed = hovered, pressed
+            self.dirty = True
+        return action_triggered
 
-        # Draw the button image on the screen
-        screen.blit(self.texture, self.area)
+    def render(self, screen, background=None):
+        ### Draw the button if its state changed since the last draw, returns the area to update or None
+        if not self.dirty:
+            return None
+        self.dirty = False
 
-        return action_triggered
+        if background is not None:
+            screen.fill(background, self.area)
+        if self.is_pressed and self.is_hovered:
+            texture = self.pressed_texture
+        elif self.is_hovered:
+            texture = self.hover_texture
+        else:
+            texture = self.texture
+        screen.blit(texture, self.area)
+        return self.area
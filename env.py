@@ -0,0 +1,224 @@
+##### HEADLESS ENVIRONMENTS #####
+# The game without a window, clock or audio, for bots and balance sweeps. Every step is one simulation tick:
+# an optional move followed by the shadow, score and collision update, exactly like a tick of main().
+# Actions are indices into gameplay.DIRECTIONS (left, right, up, down), or -1 to stand still.
+# Usage: python env.py [--envs 64] [--steps 5000] [--processes 4] [--delays 1.5 1.0] [--minimum-paths 3 5]
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from maze import MazeManager
+from gameplay import GameState, DIRECTIONS, DELAY_STEP, get_score, get_shadow_delay, is_caught
+from settings import GRID_SIZE, WIDTH, HEIGHT, CHARACTER_HEIGHT, SHADOW_DELAY_INIT, MAZE_GENERATOR, TICK_RATE
+
+STAY = -1
+MOVES = np.array(DIRECTIONS + ((0, 0),), dtype=np.int64) * GRID_SIZE # indexed by action, -1 picks the last row
+
+class ShadowEnv:
+    ### One headless game built on MazeManager and GameState
+    def __init__(self, generator=MAZE_GENERATOR, shadow_delay_init=SHADOW_DELAY_INIT, delay_step=DELAY_STEP,
+                 minimum_paths=5, tick_rate=TICK_RATE):
+        self.generator = generator
+        self.shadow_delay_init = shadow_delay_init
+        self.delay_step = delay_step
+        self.minimum_paths = minimum_paths
+        self.tick = 1 / tick_rate
+        self.state = None
+
+    def reset(self, seed=None):
+        maze_manager = MazeManager(WIDTH, HEIGHT, self.generator, seed, minimum_paths=self.minimum_paths)
+        self.state = GameState(maze_manager, self.shadow_delay_init, self.delay_step)
+        self.ticks = 0
+        self.done = False
+        return self.observe()
+
+    def step(self, action):
+        ### Advance one tick, returns (observation, done)
+        state = self.state
+        self.ticks += 1
+        current_time = self.ticks * self.tick
+        if action != STAY:
+            state.move(*DIRECTIONS[action], current_time)
+        self.done = state.update(current_time)
+        return self.observe(), self.done
+
+    def observe(self):
+        state = self.state
+        return {
+            "x": state.player_x // GRID_SIZE,
+            "y": state.player_y // GRID_SIZE,
+            "score": state.score,
+            "shadow_distance": (abs(state.player_x - state.shadow_x) + abs(state.player_y - state.shadow_y)) // GRID_SIZE,
+            "shadow_delay": state.shadow_delay,
+            "done": self.done,
+        }
+
+class VectorShadowEnv:
+    ### N games stepped together: positions, move histories, scores and collisions live in NumPy arrays.
+    ### Only the wall checks go through each game's MazeManager. Finished games restart with the next seed.
+    def __init__(self, count, seed=0, generator=MAZE_GENERATOR, shadow_delay_init=SHADOW_DELAY_INIT,
+                 delay_step=DELAY_STEP, minimum_paths=5, tick_rate=TICK_RATE):
+        self.count = count
+        self.next_seed = seed
+        self.generator = generator
+        self.shadow_delay_init = shadow_delay_init
+        self.delay_step = delay_step
+        self.minimum_paths = minimum_paths
+        self.tick = 1 / tick_rate
+
+        # Every pending move is younger than the longest delay, and there is at most one move per tick
+        capacity = 1 << (int(max(shadow_delay_init, 0.5) * tick_rate) + 2).bit_length()
+        self.mask = capacity - 1
+        self.history_x = np.zeros((count, capacity), dtype=np.int64)
+        self.history_y = np.zeros((count, capacity), dtype=np.int64)
+        self.history_time = np.zeros((count, capacity), dtype=np.float64)
+        self.head = np.zeros(count, dtype=np.int64)
+        self.tail = np.zeros(count, dtype=np.int64)
+
+        self.player_x = np.zeros(count, dtype=np.int64)
+        self.player_y = np.zeros(count, dtype=np.int64)
+        self.shadow_x = np.zeros(count, dtype=np.int64)
+        self.shadow_y = np.zeros(count, dtype=np.int64)
+        self.moved = np.zeros(count, dtype=bool)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.shadow_delay = np.zeros(count, dtype=np.float64)
+        self.done = np.zeros(count, dtype=bool)
+        self.seeds = np.zeros(count, dtype=np.int64)
+        self.maze_managers = [None] * count
+        self.rows = np.arange(count)
+
+        # Totals over finished games, for sweeps
+        self.episodes = 0
+        self.episode_scores = []
+
+    def reset(self):
+        for index in range(self.count):
+            self.reset_one(index)
+        return self.observe()
+
+    def reset_one(self, index):
+        ### Start a new game in one slot with the next seed
+        self.seeds[index] = self.next_seed
+        self.maze_managers[index] = MazeManager(WIDTH, HEIGHT, self.generator, self.next_seed,
+                                                minimum_paths=self.minimum_paths)
+        self.next_seed += 1
+        self.player_x[index] = self.shadow_x[index] = GRID_SIZE * 1
+        self.player_y[index] = self.shadow_y[index] = HEIGHT - CHARACTER_HEIGHT - GRID_SIZE
+        self.moved[index] = False
+        self.head[index] = self.tail[index] = 0
+        self.ticks[index] = 0
+        self.score[index] = 0
+        self.shadow_delay[index] = self.shadow_delay_init
+
+    def step(self, actions):
+        ### Advance every game by one tick, returns (observation arrays, done array); done games are restarted
+        actions = np.asarray(actions, dtype=np.int64)
+        self.ticks += 1
+        current_time = self.ticks * self.tick
+
+        # Moves: wall checks per game, everything else on the whole batch
+        new_x = self.player_x + MOVES[actions, 0]
+        new_y = self.player_y + MOVES[actions, 1]
+        moving = actions != STAY
+        for index in np.flatnonzero(moving):
+            maze_manager = self.maze_managers[index]
+            if maze_manager.get_cell(int(new_x[index]), int(new_y[index])) == 1:
+                moving[index] = False
+            else:
+                maze_manager.update_sections(int(new_y[index]))
+        slots = self.tail[moving] & self.mask
+        self.history_x[moving, slots] = new_x[moving]
+        self.history_y[moving, slots] = new_y[moving]
+        self.history_time[moving, slots] = current_time[moving]
+        self.tail += moving
+        self.player_x = np.where(moving, new_x, self.player_x)
+        self.player_y = np.where(moving, new_y, self.player_y)
+        self.moved |= moving
+
+        # Shadow: replay every move that is at least shadow_delay old
+        cutoff = current_time - self.shadow_delay
+        due = (self.head < self.tail) & (self.history_time[self.rows, self.head & self.mask] <= cutoff)
+        while due.any():
+            slots = self.head[due] & self.mask
+            self.shadow_x[due] = self.history_x[due, slots]
+            self.shadow_y[due] = self.history_y[due, slots]
+            self.head += due
+            due &= (self.head < self.tail) & (self.history_time[self.rows, self.head & self.mask] <= cutoff)
+
+        # Score, delay and collision, with the same rules as GameState
+        self.score = get_score(self.player_y)
+        self.shadow_delay = get_shadow_delay(self.score, self.shadow_delay_init, self.delay_step)
+        self.done = is_caught(self.player_x, self.player_y, self.shadow_x, self.shadow_y, self.moved)
+
+        observation = self.observe()
+        for index in np.flatnonzero(self.done):
+            self.episodes += 1
+            self.episode_scores.append(int(self.score[index]))
+            self.reset_one(index)
+        return observation, self.done
+
+    def observe(self):
+        return {
+            "x": self.player_x // GRID_SIZE,
+            "y": self.player_y // GRID_SIZE,
+            "score": self.score.copy(),
+            "shadow_distance": (np.abs(self.player_x - self.shadow_x) + np.abs(self.player_y - self.shadow_y)) // GRID_SIZE,
+            "shadow_delay": np.array(self.shadow_delay, dtype=np.float64),
+            "done": self.done.copy(),
+        }
+
+##### SWEEPS #####
+def climbing_policy(observation, rng, move_every=12):
+    ### Baseline bot: a random move (biased upwards) roughly every move_every ticks, otherwise stand still
+    count = len(observation["x"])
+    actions = rng.choice(len(DIRECTIONS), size=count, p=(0.2, 0.2, 0.5, 0.1))
+    return np.where(rng.random(count) < 1 / move_every, actions, STAY)
+
+def rollout(config):
+    ### Run one VectorShadowEnv with the climbing policy, returns the finished games' scores and the step rate
+    config = dict(config)
+    envs, steps = config.pop("envs"), config.pop("steps")
+    env = VectorShadowEnv(envs, **config)
+    rng = np.random.default_rng(config.get("seed", 0))
+    observation = env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        observation, _ = env.step(climbing_policy(observation, rng))
+    elapsed = time.perf_counter() - start
+    return {"episodes": env.episodes, "scores": env.episode_scores, "steps_per_second": envs * steps / elapsed}
+
+def run_sweep(configs, processes=None):
+    ### Run the rollouts of several configurations on a process pool (in this process when processes is 1)
+    if processes == 1:
+        return [rollout(config) for config in configs]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(rollout, configs))
+
+if __name__ == "__main__":
+    import argparse
+    import itertools
+    parser = argparse.ArgumentParser(description="Headless balance sweep over shadow delays and boundary paths")
+    parser.add_argument("--envs", type=int, default=64, help="games stepped together per rollout")
+    parser.add_argument("--steps", type=int, default=5000, help="ticks per rollout")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--delays", type=float, nargs="+", default=[SHADOW_DELAY_INIT], help="initial shadow delays")
+    parser.add_argument("--delay-steps", type=float, nargs="+", default=[DELAY_STEP], help="delay reduction per 20 points")
+    parser.add_argument("--minimum-paths", type=int, nargs="+", default=[5], help="open columns per section boundary")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    grid = list(itertools.product(args.delays, args.delay_steps, args.minimum_paths))
+    configs = [{"envs": args.envs, "steps": args.steps, "seed": args.seed, "shadow_delay_init": delay,
+                "delay_step": delay_step, "minimum_paths": minimum_paths}
+               for delay, delay_step, minimum_paths in grid]
+    start = time.perf_counter()
+    results = run_sweep(configs, args.processes)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'delay':>6} {'step':>6} {'paths':>6} {'games':>7} {'mean':>7} {'p90':>5} {'max':>5} {'steps/s':>10}")
+    for (delay, delay_step, minimum_paths), result in zip(grid, results):
+        scores = sorted(result["scores"]) or [0]
+        print(f"{delay:>6.2f} {delay_step:>6.3f} {minimum_paths:>6} {result['episodes']:>7} {sum(scores) / len(scores):>7.2f} "
+              f"{scores[int(len(scores) * 0.9)]:>5} {scores[-1]:>5} {result['steps_per_second']:>10.0f}")
+    total_steps = len(configs) * args.envs * args.steps
+    print(f"{total_steps} steps in {elapsed:.1f}s ({total_steps / elapsed:.0f} steps/s overall)")
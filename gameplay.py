@@ -0,0 +1,199 @@
+##### GAMEPLAY #####
+# Movement, shadow replay, score and collision rules, free of any display or audio code
+import numpy as np
+from settings import GRID_SIZE, HEIGHT, CHARACTER_HEIGHT, SHADOW_DELAY_INIT, EXTRA_SHADOW_EVERY, EXTRA_SHADOW_SPACING
+
+# Moves the player can make, in (dx, dy) cells: left, right, up, down
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# Shadow delay curve: the delay drops by DELAY_STEP seconds every DELAY_EVERY points, down to MIN_SHADOW_DELAY
+DELAY_STEP = 0.05
+DELAY_EVERY = 20
+MIN_SHADOW_DELAY = 0.5
+
+##### RULES #####
+# Written with operators that work on plain numbers and on NumPy arrays alike, so env.py applies the same
+# rules to a whole batch of games at once
+def get_score(player_y):
+    ### Score is the height reached, in cells above the starting row
+    return abs(player_y // GRID_SIZE - 13)
+
+def get_shadow_delay(score, shadow_delay_init=SHADOW_DELAY_INIT, delay_step=DELAY_STEP):
+    ### The shadow speeds up every DELAY_EVERY points, but never below MIN_SHADOW_DELAY
+    return np.maximum(MIN_SHADOW_DELAY, shadow_delay_init - (score // DELAY_EVERY) * delay_step)
+
+def is_caught(player_x, player_y, shadow_x, shadow_y, moved):
+    ### The shadow catches the player by landing on the same cell, once the player has moved
+    return (shadow_x == player_x) & (shadow_y == player_y) & moved
+
+class MovementHistory:
+    ### Ring buffer of recorded moves, with positions and timestamps in preallocated arrays
+    def __init__(self, capacity=256):
+        capacity = 1 << max(0, capacity - 1).bit_length() # power of two, so indices wrap with a mask
+        self.xs = np.zeros(capacity, dtype=np.int64)
+        self.ys = np.zeros(capacity, dtype=np.int64)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.mask = capacity - 1
+        # head and tail count moves since the start of the run, so they never move when the buffer grows
+        self.head = 0 # oldest move a shadow has not replayed yet
+        self.tail = 0 # next move to be recorded
+        # Pauses shift every recorded timestamp at once: stored times are relative to this offset
+        self.time_offset = 0.0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def grow(self):
+        ### Double the capacity, keeping every pending move at its position for the new mask
+        pending = np.arange(self.head, self.tail)
+        capacity = 2 * (self.mask + 1)
+        for name in ("xs", "ys", "times"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[pending & (capacity - 1)] = old[pending & self.mask]
+            setattr(self, name, new)
+        self.mask = capacity - 1
+
+    def append(self, x, y, time):
+        ### Record a move to (x, y) made at the given time
+        if self.tail - self.head > self.mask:
+            self.grow()
+        index = self.tail & self.mask
+        self.xs[index] = x
+        self.ys[index] = y
+        self.times[index] = time - self.time_offset
+        self.tail += 1
+
+    def add_pause(self, duration):
+        ### Shift every recorded move by the paused time in O(1)
+        self.time_offset += duration
+
+class Shadows:
+    ### Every shadow replays the player's moves from one shared MovementHistory, each at its own delay. Positions, extra
+    ### delays and read cursors live in arrays, so advancing and collision-checking any number of shadows is one NumPy step.
+    ### Shadow 0 is the original shadow; the others spawn on its position and trail it by their extra delay.
+    def __init__(self, history, x, y, capacity=8):
+        self.history = history
+        self.xs = np.full(capacity, x, dtype=np.int64)
+        self.ys = np.full(capacity, y, dtype=np.int64)
+        self.extra_delays = np.zeros(capacity, dtype=np.float64) # seconds on top of the shadow delay
+        self.cursors = np.zeros(capacity, dtype=np.int64) # next history move each shadow replays
+        self.count = 1
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, extra_delay):
+        ### Add a shadow on the original shadow's position, replaying from there extra_delay seconds later
+        if self.count == len(self.xs):
+            for name in ("xs", "ys", "extra_delays", "cursors"):
+                old = getattr(self, name)
+                setattr(self, name, np.concatenate((old, np.zeros_like(old))))
+        index = self.count
+        self.xs[index], self.ys[index] = self.xs[0], self.ys[0]
+        self.extra_delays[index] = extra_delay
+        self.cursors[index] = self.cursors[0]
+        self.count += 1
+
+    def update(self, now, delay):
+        ### Move every shadow to the newest move that is at least its delay old
+        history = self.history
+        count = self.count
+        xs, ys, cursors = self.xs[:count], self.ys[:count], self.cursors[:count]
+        cutoff = now - delay - self.extra_delays[:count] - history.time_offset
+        # At most one move is recorded per tick, so this loop rarely runs more than once
+        due = (cursors < history.tail) & (history.times[cursors & history.mask] <= cutoff)
+        while due.any():
+            slots = cursors[due] & history.mask
+            xs[due] = history.xs[slots]
+            ys[due] = history.ys[slots]
+            cursors += due
+            due &= (cursors < history.tail) & (history.times[cursors & history.mask] <= cutoff)
+        # Moves every shadow has replayed are released, so the history only holds what the last shadow still needs
+        history.head = int(cursors.min())
+
+    def catches(self, player_x, player_y, moved):
+        ### Whether any shadow landed on the player
+        return bool(is_caught(player_x, player_y, self.xs[:self.count], self.ys[:self.count], moved).any())
+
+    def positions(self):
+        ### Distinct shadow positions: shadows on the same path often share a cell, which only needs drawing once
+        return list(dict.fromkeys(zip(self.xs[:self.count].tolist(), self.ys[:self.count].tolist())))
+
+class GameState:
+    def __init__(self, maze_manager, shadow_delay_init=SHADOW_DELAY_INIT, delay_step=DELAY_STEP,
+                 extra_shadow_every=EXTRA_SHADOW_EVERY, extra_shadow_spacing=EXTRA_SHADOW_SPACING):
+        self.maze_manager = maze_manager
+        self.shadow_delay_init = shadow_delay_init
+        self.delay_step = delay_step
+        self.extra_shadow_every = extra_shadow_every
+        self.extra_shadow_spacing = extra_shadow_spacing
+
+        # Initialize player position
+        self.player_x, self.player_y = GRID_SIZE * 1, HEIGHT - CHARACTER_HEIGHT - GRID_SIZE
+        self.player_speed = GRID_SIZE
+        self.moved = False
+
+        # Movement history system, replayed by the shadows
+        self.movement_history = MovementHistory()
+        self.shadows = Shadows(self.movement_history, GRID_SIZE * 1, HEIGHT - CHARACTER_HEIGHT - GRID_SIZE)
+        self.pause_duration = 0 # only set by the pause records of legacy replays, see add_pause
+
+        self.score = 0
+        self.shadow_delay = shadow_delay_init
+
+    def move(self, dx, dy, current_time):
+        ### Move the player by (dx, dy) cells unless a wall is in the way, returns whether the player moved
+        new_x = self.player_x + dx * self.player_speed
+        new_y = self.player_y + dy * self.player_speed
+
+        # Check if the new position is valid
+        if self.maze_manager.get_cell(new_x, new_y) == 1:
+            return False
+
+        self.moved = True
+        # Record the movement
+        self.movement_history.append(new_x, new_y, current_time)
+        self.player_x, self.player_y = new_x, new_y
+        self.maze_manager.update_sections(new_y)
+        return True
+
+    @property
+    def shadow_x(self):
+        return int(self.shadows.xs[0])
+
+    @property
+    def shadow_y(self):
+        return int(self.shadows.ys[0])
+
+    def add_pause(self, duration):
+        ### Time spent paused does not count towards the shadow delay. Legacy only: the game no longer advances the
+        ### simulation clock while paused, this just plays back the pause records of older replay files
+        self.pause_duration += duration
+
+    def update_shadow(self, current_time):
+        ### Replay every recorded move that is at least shadow_delay old (plus each shadow's extra delay)
+        if self.pause_duration:
+            self.movement_history.add_pause(self.pause_duration)
+            self.pause_duration = 0
+        self.shadows.update(current_time, self.shadow_delay)
+
+    def update_score(self):
+        ### Score is the height reached, the shadow speeds up every 20 points
+        self.score = get_score(self.player_y)
+        self.shadow_delay = float(get_shadow_delay(self.score, self.shadow_delay_init, self.delay_step))
+        # Hard mode: one more shadow every extra_shadow_every points, each trailing the last by the spacing
+        if self.extra_shadow_every:
+            while len(self.shadows) <= self.score // self.extra_shadow_every:
+                self.shadows.spawn(len(self.shadows) * self.extra_shadow_spacing)
+        return self.score
+
+    def update(self, current_time):
+        ### Advance the shadow and the score for one frame, returns whether the shadow caught the player
+        self.update_shadow(current_time)
+        self.update_score()
+        return self.is_caught()
+
+    def is_caught(self):
+        ### Check for collision between the shadows and the player
+        return self.shadows.catches(self.player_x, self.player_y, self.moved)
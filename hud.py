@@ -0,0 +1,88 @@
+##### HUD #####
+# Score and FPS, either in the window caption or drawn in a corner of the window. Nothing is sent to the window
+# manager or re-rendered unless a shown value changed; numbers are composed from cached digit glyphs.
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import time
+import pygame
+from settings import WHITE, BLACK, WINDOW_TITLE, HUD_IN_WINDOW, HUD_FONT_SIZE
+from assets import render_text
+
+FPS_INTERVAL = 0.5 # seconds between FPS readings, so the shown value doesn't flicker every frame
+PADDING = 4
+
+class Hud:
+    def __init__(self, in_window=HUD_IN_WINDOW, font_size=HUD_FONT_SIZE, color=WHITE):
+        self.in_window = in_window
+        self.font_size = font_size
+        self.color = color
+        self.caption = None # last caption sent to the window manager
+        self.values = None # (score, fps) shown right now
+        self.fps = 0
+        self.fps_updated = 0
+        self.surface = None # composed in-window HUD for the current values
+        self.rect = pygame.Rect(PADDING, PADDING, 0, 0) # screen area of the in-window HUD, only ever grows
+        self.redraw = False # the values changed since the HUD was last drawn
+
+    def set_caption(self, caption):
+        ### Set the window caption, unless it already says this
+        if caption != self.caption:
+            self.caption = caption
+            pygame.display.set_caption(caption)
+
+    def render_number(self, text):
+        ### Compose a line from cached glyphs, one per character, so new numbers never go through the font renderer
+        glyphs = [render_text(character, self.font_size, self.color) for character in text]
+        surface = pygame.Surface((sum(glyph.get_width() for glyph in glyphs), glyphs[0].get_height()))
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+    def update(self, score, fps):
+        ### Take the current values, sampling the FPS twice a second; the caption or HUD only changes with them
+        now = time.perf_counter()
+        if now - self.fps_updated >= FPS_INTERVAL:
+            self.fps = fps
+            self.fps_updated = now
+        if not self.in_window:
+            # Menus change the caption too, so it is compared as text rather than by value
+            if score > 0:
+                self.set_caption(f"Score: {score} - FPS: {self.fps}")
+            else:
+                self.set_caption(f"{WINDOW_TITLE} - FPS: {self.fps}")
+            return
+
+        self.set_caption(WINDOW_TITLE)
+        values = (score, self.fps)
+        if values == self.values:
+            return
+        self.values = values
+        lines = [render_text("Score", self.font_size, self.color), self.render_number(str(score)),
+                 render_text("FPS", self.font_size, self.color), self.render_number(str(self.fps))]
+        width = sum(line.get_width() for line in lines) + PADDING * (2 * len(lines) + 1)
+        height = max(line.get_height() for line in lines) + 2 * PADDING
+        self.rect.width = max(self.rect.width, width)
+        self.rect.height = max(self.rect.height, height)
+        self.surface = pygame.Surface(self.rect.size)
+        self.surface.fill(BLACK)
+        x = PADDING
+        for index, line in enumerate(lines):
+            self.surface.blit(line, (x, PADDING))
+            x += line.get_width() + (3 if index % 2 else 1) * PADDING
+        self.redraw = True
+
+    def draw(self, window, renderer, changed):
+        ### Draw the in-window HUD over a rendered frame, returns the renderer's changed areas plus the HUD's if needed.
+        ### renderer is None when the frame is scaled into the window, the HUD is then never on the renderer's surface.
+        if not self.in_window or self.surface is None:
+            return changed
+        if renderer is not None:
+            renderer.overlays = [self.rect] # restored by the renderer before the next frame is drawn over it
+        if changed is None or self.redraw or self.rect.collidelist(changed) != -1:
+            window.blit(self.surface, self.rect)
+            self.redraw = False
+            if changed is not None:
+                changed = changed + [self.rect]
+        return changed
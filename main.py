@@ -1,389 +1,282 @@
 ##### IMPORTS #####
-import os, sys, platform
+import os, sys
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
 import pygame
-import numpy as np
-import random, time
-from collections import deque
+import time
+import math
 import asyncio
 from button import Button
 from enum import Enum
-import json
-
-##### FUNCTION TO ACCESS ASSETS #####
-def get_asset_path(filename):
-    if getattr(sys, "frozen", False):
-        base_path = os.path.dirname(sys.executable)
-    else:
-        base_path = os.path.dirname(__file__)
-    return os.path.join(base_path, "assets", filename)
-
-##### Initializing the Pygame Libraries #####
-pygame.init()
-pygame.font.init()
-pygame.mixer.init()
-
-##### CONSTANTS #####
-WINDOWSIZE = WIDTH, HEIGHT = 750, 750
-if WIDTH != HEIGHT:
-    min_size = min(WIDTH, HEIGHT)
-    WIDTH = min_size
-    HEIGHT = min_size
-GRID_SIZE = 50
-CHARACTER_WIDTH, CHARACTER_HEIGHT = GRID_SIZE, GRID_SIZE
-# COLORS (RGB)
-WHITE = (255, 255, 255)
-BROWN = (128, 0, 0)
-BLACK = (0, 0, 0)
-GRAY = (142, 143, 133)
-RED = (255, 0, 0)
-# CHARACTERS
-CHARACTER_IMAGE = pygame.image.load(get_asset_path("character.png"))
-CHARACTER = pygame.transform.scale(CHARACTER_IMAGE, (CHARACTER_WIDTH, CHARACTER_HEIGHT))
-SHADOW_IMAGE = pygame.image.load(get_asset_path("shadow.png"))
-SHADOW = pygame.transform.scale(SHADOW_IMAGE, (CHARACTER_WIDTH, CHARACTER_HEIGHT))
-SHADOW_DELAY_INIT = 1.5 # delay in seconds
-SHADOW_DELAY_INIT = max(0.5, min(3, SHADOW_DELAY_INIT))
-SHADOW_DELAY = SHADOW_DELAY_INIT # delay in seconds
-# BUTTONS
-COLORED_BUTTONS = True # change to False for white-on-black buttons
-if COLORED_BUTTONS:
-    RESUME_BUTTON = Button(WIDTH//2, HEIGHT//2, pygame.image.load(get_asset_path("buttons/resume_col_button.png")), 0.5)
-    RESTART_BUTTON = Button(WIDTH//2, HEIGHT//2+1*(HEIGHT//6), pygame.image.load(get_asset_path("buttons/restart_col_button.png")), 0.5)
-    QUIT_BUTTON = Button(WIDTH//2, HEIGHT//2+2*(HEIGHT//6), pygame.image.load(get_asset_path("buttons/quit_col_button.png")), 0.5)
-else:
-    RESUME_BUTTON = Button(WIDTH//2, HEIGHT//2, pygame.image.load(get_asset_path("buttons/resume_button.png")), 0.5)
-    RESTART_BUTTON = Button(WIDTH//2, HEIGHT//2+1*(HEIGHT//6), pygame.image.load(get_asset_path("buttons/restart_button.png")), 0.5)
-    QUIT_BUTTON = Button(WIDTH//2, HEIGHT//2+2*(HEIGHT//6), pygame.image.load(get_asset_path("buttons/quit_button.png")), 0.5)
-# SOUNDS
-if sys.platform == "emscripten":
-    DEATH_SFX1 = pygame.mixer.Sound(get_asset_path("sounds/monster_growl.ogg"))
-    DEATH_SFX2 = pygame.mixer.Sound(get_asset_path("sounds/monster_growl.ogg"))
-    PAUSE_MENU_MUSIC = pygame.mixer.Sound(get_asset_path("music/pause_menu.ogg"))
-else:
-    DEATH_SFX1 = pygame.mixer.Sound(get_asset_path("sounds/monster_growl.mp3"))
-    DEATH_SFX2 = pygame.mixer.Sound(get_asset_path("sounds/monster_growl.mp3"))
-    PAUSE_MENU_MUSIC = pygame.mixer.Sound(get_asset_path("music/pause_menu.mp3"))
-# MUSIC
-if sys.platform == "emscripten":
-    pygame.mixer.music.load(get_asset_path("music/background2.ogg"))
-else:
-    pygame.mixer.music.load(get_asset_path("music/background2.mp3"))
-# FONT
-GAME_OVER_FONT = pygame.font.SysFont("times new roman", 96)
-PAUSED_FONT = pygame.font.SysFont("times new roman", 96)
-FONT = pygame.font.SysFont("times new roman", 48)
-# FPS
-FPS = 60
-##### WINDOW #####
-window = pygame.display.set_mode((WINDOWSIZE))
-WINDOW_TITLE = "Shadow Paradox"
-pygame.display.set_caption(WINDOW_TITLE)
-pygame.display.set_icon(SHADOW_IMAGE)
-
-class MazeManager:
-    def __init__(self, width, height):
-        self.width = width // GRID_SIZE
-        self.section_height = height // GRID_SIZE
-        self.current_section = 0
-        self.maze_sections = {}
-        self.lowest_section = 0
-        self.highest_section = 1
-        self.vertical_paths = set()
-        self.path_memory = {}
-        self.minimum_paths = 5
-        self.generate_initial_sections()
-    
-    def get_neighbors(self, x, y, grid):
-        ### Get valid neighboring cells for maze generation
-        directions = [(0, 2), (2, 0), (0, -2), (-2, 0)]
-        neighbors = []
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
-            if (0 < new_x < len(grid[0]) - 1 and 
-                0 < new_y < len(grid) - 1 and 
-                grid[new_y][new_x] == 1):
-                neighbors.append((new_x, new_y, dx, dy))
-        random.shuffle(neighbors)
-        return neighbors
-    
-    def carve_path(self, grid, start_x, start_y, entry_points=None, exit_points=None):
-        ### Generate maze paths using modified DFS with guaranteed connectivity
-        stack = [(start_x, start_y)]
-        grid[start_y][start_x] = 0
-        
-        # Ensure entry points are open
-        if entry_points:
-            for x in entry_points:
-                grid[0][x] = 0
-                grid[1][x] = 0
-        
-        # Ensure exit points are open
-        if exit_points:
-            for x in exit_points:
-                grid[-1][x] = 0
-                grid[-2][x] = 0
-        
-        while stack:
-            current = stack[-1]
-            neighbors = self.get_neighbors(current[0], current[1], grid)
-            
-            if not neighbors:
-                stack.pop()
-                continue
-            
-            next_x, next_y, dx, dy = neighbors[0]
-            # Carve passage
-            grid[current[1] + dy//2][current[0] + dx//2] = 0
-            grid[next_y][next_x] = 0
-            stack.append((next_x, next_y))
-        
-        return grid
-
-    def ensure_vertical_connectivity(self, grid, section_number): #TODO: fix this since sometimes there is no available path
-        ### Ensure vertical connectivity between sections with multiple guaranteed paths
-        if section_number in self.path_memory:
-            entry_points = self.path_memory[section_number]["entries"]
+from settings import (WINDOWSIZE, WIDTH, HEIGHT, WHITE, BLACK, RED, COLORED_BUTTONS, FPS, IDLE_FPS, TICK_RATE,
+                      MAX_FRAME_TIME, VSYNC, CAMERA_SMOOTHING, WINDOW_TITLE,
+                      REPLAY_DIR, PROFILE_PATH, PROFILE_OVERLAY, RENDERER, PREFETCH_SECTIONS, GENERATION_BUDGET,
+                      MAZE_PACK, DISPLAY_SIZE, RESIZABLE, FULLSCREEN)
+from assets import load_image, play_sound, play_music, get_font, render_text
+from maze import MazeManager, run_steps
+from maze_pack import MazePack
+from gameplay import GameState
+from replay import ReplayRecorder
+from profiler import FrameProfiler
+from hud import Hud
+from rendering import RENDERERS
+
+# Arrow keys, WASD and IJKL all move the player by one cell
+MOVE_KEYS = {}
+for keys, direction in (((pygame.K_LEFT, pygame.K_a, pygame.K_j), (-1, 0)),
+                        ((pygame.K_RIGHT, pygame.K_d, pygame.K_l), (1, 0)),
+                        ((pygame.K_UP, pygame.K_w, pygame.K_i), (0, -1)),
+                        ((pygame.K_DOWN, pygame.K_s, pygame.K_k), (0, 1))):
+    for key in keys:
+        MOVE_KEYS[key] = direction
+
+# Every phase the game loop and renderers mark, in the order they run; "events" and "shadow" only in frames with ticks
+FRAME_PHASES = ("events", "shadow", "draw maze", "draw sprites", "present", "hud", "flip", "generation")
+
+class App:
+    ### Owns pygame, the window and the clock. Nothing is initialized until an App is created.
+    def __init__(self):
+        self.startup_timings = {} # phase -> seconds, in the order the phases ran
+        self.last_mark = time.perf_counter()
+        self.started = False
+        self.buttons = None
+        self.buttons_size = None # window size the buttons were laid out for
+
+        ##### Initializing the Pygame Libraries #####
+        pygame.init()
+        pygame.font.init()
+        pygame.mixer.init()
+        self.mark_startup("pygame init")
+
+        ##### WINDOW #####
+        flags = pygame.FULLSCREEN if FULLSCREEN else pygame.RESIZABLE if RESIZABLE else 0
+        if VSYNC:
+            # vsync needs a renderer-backed window, which SCALED provides
+            self.window = pygame.display.set_mode(DISPLAY_SIZE, flags | pygame.SCALED, vsync=1)
         else:
-            # Generate more entry points for better connectivity
-            entry_points = set(random.sample(range(1, self.width-1, 2), self.minimum_paths))
-        
-        # Generate more exit points for better connectivity
-        exit_points = set(random.sample(range(1, self.width-1, 2), self.minimum_paths))
-        
-        # Ensure at least one exit point is near each entry point for better vertical progression
-        for entry in entry_points:
-            nearby_range = range(max(1, entry - 2), min(self.width - 1, entry + 3), 2)
-            if not any(x in exit_points for x in nearby_range):
-                potential_exit = random.choice(list(nearby_range))
-                exit_points.add(potential_exit)
-        
-        # Store exit points as entry points for next section
-        self.path_memory[section_number + 1] = {"entries": exit_points}
-        
-        # Create wider passages
-        for x in entry_points:
-            grid[0][x] = 0
-            grid[1][x] = 0
-            if x > 1: # add side passages
-                grid[1][x-1] = 0
-            if x < len(grid[0])-2:
-                grid[1][x+1] = 0
-        
-        for x in exit_points:
-            grid[-1][x] = 0
-            grid[-2][x] = 0
-            if x > 1: # add side passages
-                grid[-2][x-1] = 0
-            if x < len(grid[0])-2:
-                grid[-2][x+1] = 0
-        
-        return grid, entry_points, exit_points
-
-    def generate_maze_section(self, section_number):
-        ### Generate a new maze section with guaranteed paths
-        grid = np.ones((self.section_height, self.width), dtype=int)
-        
-        # Get or generate entry/exit points
-        grid, entry_points, exit_points = self.ensure_vertical_connectivity(grid, section_number)
-        
-        # Generate the maze paths starting from multiple points
-        for start_x in entry_points:
-            grid = self.carve_path(grid, start_x, 1, entry_points, exit_points)
-        
-        # Additional path generation from exit points upward
-        for end_x in exit_points:
-            grid = self.carve_path(grid, end_x, self.section_height - 2, entry_points, exit_points)
-        
-        # Ensure all points are connected
-        self.connect_all_points(grid, entry_points, exit_points)
-        
-        # Add some random extra passages for variety
-        self.add_extra_passages(grid)
-        
-        return grid
-    
-    def connect_all_points(self, grid, entry_points, exit_points):
-        ### Ensure all entry and exit points are connected to the maze
-        def find_nearest_path(x, y, grid):
-            visited = set()
-            queue = deque([(x, y, [])])
-            
-            while queue:
-                curr_x, curr_y, path = queue.popleft()
-                if grid[curr_y][curr_x] == 0:
-                    return path
-                
-                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    next_x, next_y = curr_x + dx, curr_y + dy
-                    if (0 < next_x < len(grid[0]) - 1 and 
-                        0 < next_y < len(grid) - 1 and 
-                        (next_x, next_y) not in visited):
-                        visited.add((next_x, next_y))
-                        new_path = path + [(next_x, next_y)]
-                        queue.append((next_x, next_y, new_path))
-            return []
-        
-        # Connect entry points
-        for x in entry_points:
-            if grid[1][x] == 1: # if not already connected
-                path = find_nearest_path(x, 1, grid)
-                for px, py in path:
-                    grid[py][px] = 0
-        
-        # Connect exit points
-        for x in exit_points:
-            if grid[-2][x] == 1: # if not already connected
-                path = find_nearest_path(x, len(grid)-2, grid)
-                for px, py in path:
-                    grid[py][px] = 0
-
-    def generate_initial_sections(self):
-        ### Generate initial maze sections
-        self.maze_sections[0] = self.generate_maze_section(0)
-        self.maze_sections[1] = self.generate_maze_section(1)
-    
-    def get_current_grid_position(self, pixel_y):
-        ### Convert pixel Y position to grid coordinates and section number
-        section = pixel_y // (self.section_height * GRID_SIZE)
-        return section
-    
-    def ensure_section_exists(self, section):
-        ### Ensure that the required maze section exists and manage section cleanup
-        # Generate new sections above as needed
-        while section >= self.highest_section:
-            self.highest_section += 1
-            self.maze_sections[self.highest_section] = self.generate_maze_section(self.highest_section)
-        
-        # Generate new sections below if needed
-        while section < self.lowest_section:
-            self.lowest_section -= 1
-            self.maze_sections[self.lowest_section] = self.generate_maze_section(self.lowest_section)
-        
-        # Cleanup old sections
-        sections_to_remove = []
-        for old_section in self.maze_sections:
-            if old_section < section - 2 or old_section > section + 2:
-                sections_to_remove.append(old_section)
-        
-        for old_section in sections_to_remove:
-            del self.maze_sections[old_section]
-            if old_section == self.lowest_section:
-                self.lowest_section = min(self.maze_sections.keys())
-            if old_section == self.highest_section:
-                self.highest_section = max(self.maze_sections.keys())
-    
-    def get_cell(self, pixel_x, pixel_y):
-        ### Get the value of a cell at the given pixel coordinates
-        grid_x = pixel_x // GRID_SIZE
-        grid_y = pixel_y // GRID_SIZE
-        section = self.get_current_grid_position(pixel_y)
-        local_y = grid_y % self.section_height
-        
-        self.ensure_section_exists(section)
-        
-        if section in self.maze_sections and 0 <= grid_x < self.width:
+            self.window = pygame.display.set_mode((0, 0) if FULLSCREEN else DISPLAY_SIZE, flags)
+        self.fit_screen()
+        self.hud = Hud()
+        self.hud.set_caption(WINDOW_TITLE)
+        pygame.display.set_icon(load_image("shadow.png"))
+        self.clock = pygame.time.Clock() # ticked once per drawn frame, so it measures the frame rate
+        self.tick_clock = pygame.time.Clock() # paces the game loop, which may wake up more often than it draws
+        self.profiler = FrameProfiler(PROFILE_PATH, FRAME_PHASES)
+        self.profiler.show_overlay = PROFILE_OVERLAY
+        self.set_renderer(RENDERER)
+        self.mark_startup("window")
+
+        # Pre-generated sections shared by every run (see maze_pack.py)
+        self.pack = MazePack(MAZE_PACK) if MAZE_PACK is not None else None
+        self.mark_startup("maze pack")
+
+        # The next run's maze, built a slice at a time while the game over or pause screen is showing
+        self.next_maze = None
+        self.next_maze_job = None
+
+    def mark_startup(self, phase):
+        ### Record how long a startup phase took (ignored once the first frame is on screen)
+        if self.started:
+            return
+        now = time.perf_counter()
+        self.startup_timings[phase] = now - self.last_mark
+        self.last_mark = now
+        if phase == "first frame":
+            self.started = True
+
+    def fit_screen(self):
+        ### Pick the surface the game is drawn on: the window itself when it is WINDOWSIZE, otherwise a WIDTH x HEIGHT
+        ### frame scaled into the window by the largest whole factor that fits (just to fit if none does), centered
+        if self.window.get_size() == tuple(WINDOWSIZE):
+            self.screen = self.window
+            self.scale = 1
+            self.view = self.window.get_rect()
+            return
+        self.screen = pygame.Surface((WIDTH, HEIGHT)).convert(self.window)
+        window_width, window_height = self.window.get_size()
+        factor = min(window_width // WIDTH, window_height // HEIGHT)
+        if factor >= 1:
+            self.scale = factor
+            size = (WIDTH * factor, HEIGHT * factor)
+        else:
+            self.scale = None
+            ratio = min(window_width / WIDTH, window_height / HEIGHT)
+            size = (max(1, int(WIDTH * ratio)), max(1, int(HEIGHT * ratio)))
+        self.view = pygame.Rect((0, 0), size)
+        self.view.center = self.window.get_rect().center
+        self.window.fill(BLACK)
+
+    def resize(self):
+        ### The window was resized: refit the frame, the next one has to be drawn in full
+        self.window = pygame.display.get_surface()
+        self.fit_screen()
+        self.renderer.invalidate()
+
+    def present(self, changed):
+        ### Scale the changed areas of the frame into the window, returns the window areas to update (None means all).
+        ### A full frame is one transform.scale call; with a whole factor, dirty rects are scaled one by one.
+        if self.screen is self.window:
+            return changed
+        if changed is None or self.scale is None:
+            pygame.transform.scale(self.screen, self.view.size, self.window.subsurface(self.view))
+            return None
+        areas = []
+        for area in changed:
+            area = area.clip(self.screen.get_rect())
+            if area.width and area.height:
+                target = pygame.Rect(self.view.x + area.x * self.scale, self.view.y + area.y * self.scale,
+                                     area.width * self.scale, area.height * self.scale)
+                pygame.transform.scale(self.screen.subsurface(area), target.size, self.window.subsurface(target))
+                areas.append(target)
+        return areas
+
+    def set_renderer(self, name):
+        ### Switch to one of the renderers in rendering.RENDERERS
+        self.renderer_name = name
+        self.renderer = RENDERERS[name]()
+        self.renderer.profiler = self.profiler
+
+    def get_fps(self):
+        ### Frames per second for the caption (Clock reports infinity when uncapped frames take under a millisecond)
+        fps = self.clock.get_fps()
+        return int(fps) if math.isfinite(fps) else 1000
+
+    def prepare_next_maze(self, budget):
+        ### Build the next run's maze (its first sections, then the prefetched ones) for up to budget seconds,
+        ### returns whether work is left
+        if self.next_maze is None:
+            self.next_maze = MazeManager(WIDTH, HEIGHT, prefetch=PREFETCH_SECTIONS, pack=self.pack, generate=False)
+            self.next_maze_job = self.next_maze.iter_start()
+        deadline = time.perf_counter() + budget
+        if self.next_maze_job is not None:
             try:
-                return self.maze_sections[section][local_y][grid_x]
-            except IndexError:
-                return 1
-        return 1
-    
-    def add_extra_passages(self, grid):
-        ### Add some random extra passages to prevent dead ends
-        for _ in range(self.width // 2):
-            x = random.randint(1, self.width - 2)
-            y = random.randint(1, self.section_height - 2)
-            if grid[y][x] == 1:
-                # Check if adding a passage here would connect two existing paths
-                neighbors = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-                path_count = sum(1 for nx, ny in neighbors if 0 <= nx < self.width and 
-                               0 <= ny < self.section_height and grid[ny][nx] == 0)
-                if path_count >= 2:
-                    grid[y][x] = 0
-        
-        return grid
+                while time.perf_counter() < deadline:
+                    next(self.next_maze_job)
+                return True
+            except StopIteration:
+                self.next_maze_job = None
+        return self.next_maze.advance_generation(max(0.0, deadline - time.perf_counter()))
+
+    def take_next_maze(self):
+        ### The maze for a new run: the prepared one, its first sections finished now if the player was quicker
+        if self.next_maze is None:
+            self.prepare_next_maze(0)
+        if self.next_maze_job is not None:
+            run_steps(self.next_maze_job)
+        maze_manager = self.next_maze
+        self.next_maze = self.next_maze_job = None
+        return maze_manager
+
+    def get_buttons(self):
+        ### Pause menu buttons, laid out for the window the first time the game is paused (and again after a resize)
+        width, height = self.window.get_size()
+        if self.buttons is None or self.buttons_size != (width, height):
+            style = "col_button" if COLORED_BUTTONS else "button"
+            self.buttons = (
+                Button(width//2, height//2, load_image(f"buttons/resume_{style}.png", scale=0.5), 1),
+                Button(width//2, height//2+1*(height//6), load_image(f"buttons/restart_{style}.png", scale=0.5), 1),
+                Button(width//2, height//2+2*(height//6), load_image(f"buttons/quit_{style}.png", scale=0.5), 1),
+            )
+            self.buttons_size = (width, height)
+        return self.buttons
 
 class PauseMenuAction(Enum):
     RESUME = 0
     RESTART = 1
     QUIT = 2
 
-def show_game_over_screen(window, score, shadow_delay, clock): # returns whether player wants to restart
+async def wait_for_events(app):
+    ### Sleep until input arrives (or 1/IDLE_FPS s passes) instead of spinning, returns the pending events.
+    ### Until the next run's maze is ready, the time is spent building it instead and input is only polled.
+    if app.prepare_next_maze(GENERATION_BUDGET):
+        await asyncio.sleep(0)
+        return pygame.event.get()
+    if sys.platform == "emscripten":
+        # The browser build can't block: poll at a low rate and hand control back to the page
+        app.clock.tick(IDLE_FPS)
+        await asyncio.sleep(0)
+        return pygame.event.get()
+    event = pygame.event.wait(1000 // IDLE_FPS)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+async def show_game_over_screen(app, score, shadow_delay): # returns whether player wants to restart
     ### Display the Game Over screen with the final score and shadow delay.
-    rand_num = random.randint(1, 2)
-    if rand_num == 1:
-        DEATH_SFX1.play()
-    elif rand_num == 2:
-        DEATH_SFX2.play()
+    play_sound("sounds/monster_growl")
     pygame.mixer.music.fadeout(1500)
-    
-    window.fill(BLACK)
-    pygame.display.set_caption(f"Game Over - FPS: {int(clock.get_fps())}")
-    
-    # Render "Game Over" text
-    game_over_text = GAME_OVER_FONT.render("GAME OVER", True, RED)
-    text_rect = game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 3))
-    window.blit(game_over_text, text_rect)
-    
-    # Render Score
-    score_text = FONT.render(f"Score: {score}", True, WHITE)
-    score_rect = score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-    window.blit(score_text, score_rect)
-    
-    # Render Shadow Delay
-    delay_text = FONT.render(f"Shadow Delay: {shadow_delay:.2f}s", True, WHITE)
-    delay_rect = delay_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-    window.blit(delay_text, delay_rect)
-    
-    # Update the display
-    pygame.display.flip()
+
+    app.hud.set_caption(f"Game Over - FPS: {app.get_fps()}")
+
+    def draw():
+        # Menus are drawn on the window itself, at its full resolution, centered
+        window = app.window
+        width, height = window.get_size()
+        window.fill(BLACK)
+
+        # Render "Game Over" text
+        game_over_text = render_text("GAME OVER", 96, RED)
+        window.blit(game_over_text, game_over_text.get_rect(center=(width // 2, height // 3)))
+
+        # Render Score
+        score_text = render_text(f"Score: {score}", 48, WHITE)
+        window.blit(score_text, score_text.get_rect(center=(width // 2, height // 2)))
+
+        # Render Shadow Delay
+        delay_text = render_text(f"Shadow Delay: {shadow_delay:.2f}s", 48, WHITE)
+        window.blit(delay_text, delay_text.get_rect(center=(width // 2, height // 2 + 50)))
+
+        # Update the display once, nothing on this screen changes
+        pygame.display.flip()
+    draw()
 
     # Wait for player to quit
-    waiting = True
     game_over_time = pygame.time.get_ticks()
     print("Press 'q' to quit...")
-    while waiting:
-        for event in pygame.event.get():
+    while True:
+        for event in await wait_for_events(app):
             if event.type == pygame.QUIT:
                 return False
+            if event.type == pygame.VIDEORESIZE:
+                app.resize()
+                draw()
             if event.type == pygame.KEYDOWN and (pygame.time.get_ticks() - game_over_time >= 500):
                 if event.key == pygame.K_q:
                     return False
                 return True
 
-def show_pause_menu(window, moved, clock):
+async def show_pause_menu(app, moved):
     ### Display Pause Menu
-    PAUSE_MENU_MUSIC.play(-1)
+    pause_menu_music = play_sound("music/pause_menu", -1)
     pygame.mixer.music.fadeout(1500)
 
-    window.fill(BLACK)
-    pygame.display.set_caption(f"Pause Menu - FPS: {int(clock.get_fps())}")
+    app.hud.set_caption(f"Pause Menu - FPS: {app.get_fps()}")
     print("Paused...")
-    
+
+    def draw():
+        # Render "Paused" text and the buttons once, afterwards only buttons whose state changed are redrawn
+        window = app.window
+        window.fill(BLACK)
+        paused_text = render_text("Paused", 96, WHITE)
+        window.blit(paused_text, paused_text.get_rect(center=(window.get_width() // 2, window.get_height() // 6)))
+        mouse_pos = pygame.mouse.get_pos()
+        buttons = app.get_buttons()
+        for button in buttons:
+            button.reset(mouse_pos)
+            button.render(window)
+        pygame.display.flip()
+        return buttons
+    buttons = draw()
+
     action = None
 
     # Wait for player to quit
-    waiting = True
-    while waiting:
-        # Render "Paused" text
-        paused_text = PAUSED_FONT.render("Paused", True, WHITE)
-        text_rect = paused_text.get_rect(center=(WIDTH // 2, HEIGHT // 6))
-        window.blit(paused_text, text_rect)
-        
-        # Render Buttons
-        if RESUME_BUTTON.render(window):# fix castling chatgpt glitch and check glitch
-            print("Unpaused.")
-            action = PauseMenuAction.RESUME
-        if RESTART_BUTTON.render(window):
-            print("Restarting...")
-            action = PauseMenuAction.RESTART
-        if QUIT_BUTTON.render(window):
-            action = PauseMenuAction.QUIT
-    
-        for event in pygame.event.get():
+    while action is None:
+        for event in await wait_for_events(app):
             if event.type == pygame.QUIT:
                 action = PauseMenuAction.QUIT
+            if event.type == pygame.VIDEORESIZE:
+                app.resize()
+                buttons = draw()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     print("Unpaused.")
@@ -393,170 +286,214 @@ def show_pause_menu(window, moved, clock):
                     action = PauseMenuAction.RESTART
                 if event.key == pygame.K_q:
                     action = PauseMenuAction.QUIT
-        
-        if action is not None:
-            if moved:
-                pygame.mixer.music.play(-1)
-            PAUSE_MENU_MUSIC.fadeout(1500)
-            return action
-        # Update the display
-        pygame.display.flip()
 
-async def main(game):
+            # Buttons
+            resume_button, restart_button, quit_button = buttons
+            if resume_button.handle_event(event):# fix castling chatgpt glitch and check glitch
+                print("Unpaused.")
+                action = PauseMenuAction.RESUME
+            if restart_button.handle_event(event):
+                print("Restarting...")
+                action = PauseMenuAction.RESTART
+            if quit_button.handle_event(event):
+                action = PauseMenuAction.QUIT
+
+        # Update only the buttons that changed
+        changed = [area for area in (button.render(app.window, BLACK) for button in buttons) if area]
+        if changed:
+            pygame.display.update(changed)
+
+    if moved:
+        play_music()
+    pause_menu_music.fadeout(1500)
+    return action
+
+def update_camera(camera_y, player_y, dt):
+    ### Move the camera towards the player smoothly, at the same speed whatever the tick or frame rate
+    target_camera_y = player_y - HEIGHT // 2
+    return camera_y + (target_camera_y - camera_y) * (1 - math.exp(-CAMERA_SMOOTHING * dt))
+
+async def main(app, game):
     print("----------------------------------------")
     print(f"Game #{game}:")
-    clock = pygame.time.Clock()
-    is_paused = False
+    clock = app.clock
+    renderer = app.renderer
+    renderer.invalidate()
     run = True
-    score = 0
-    SHADOW_DELAY = SHADOW_DELAY_INIT
-    pause_duration = 0
-
-    # Initialize player position
-    player_x, player_y = GRID_SIZE * 1, HEIGHT - CHARACTER_HEIGHT - GRID_SIZE
-    player_speed = GRID_SIZE
-    shadow_x, shadow_y = GRID_SIZE * 1, HEIGHT - CHARACTER_HEIGHT - GRID_SIZE
-    shadow_speed = GRID_SIZE
-    moved = False
-    
-    # Movement history system
-    movement_history = deque()
-    last_move_time = time.time()
-
-    # Initialize maze manager
-    maze_manager = MazeManager(WIDTH, HEIGHT)
-
-    # Camera position
+
+    # Initialize maze manager (prepared during the previous screen if there was one) and player/shadow state
+    maze_manager = app.take_next_maze()
+    print(f"Seed: {maze_manager.seed}")
+    state = GameState(maze_manager)
+    app.mark_startup("maze")
+
+    # Count and time the hot MazeManager calls in the frame profiler: cell reads, sections loaded on demand (from the
+    # store, the prefetched builds or the pack, otherwise generated right there), boundary checks and prefetched builds
+    profiler = app.profiler
+    profiler.instrument(maze_manager, "get_cell", "add_section", "generate_maze_section", "check_section_pair",
+                        "advance_generation")
+
+    # Optionally record the run so it can be replayed with replay.py (one replay frame per simulation tick)
+    recorder = None
+    if REPLAY_DIR is not None:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        recorder = ReplayRecorder(os.path.join(REPLAY_DIR, f"{int(time.time())}_game{game}_{maze_manager.seed}.replay"),
+                                  maze_manager.seed, maze_manager.generator, maze_manager.pack)
+
+    # Camera position, before and after the last tick so frames can be drawn in between
     camera_x, camera_y = 0, 0
+    previous_camera_y = camera_y
+
+    # The simulation advances in fixed ticks of simulated time, which only runs while the game is on screen
+    tick = 1 / TICK_RATE
+    sim_time = 0.0
+    ticks = 0
+    accumulator = 0.0
+    last_time = time.perf_counter()
+    caught = False
+
+    # With fewer frames than ticks the loop still wakes up every tick, so input is read as it arrives rather than
+    # once per frame, and only draws when a frame is due. FPS 0 wakes up and draws uncapped (or at the vsync rate).
+    wake_rate = TICK_RATE if 0 < FPS < TICK_RATE else FPS
+    frame_interval = 1 / FPS if FPS else 0.0
+    next_frame = 0.0
+    frame_started = False
 
     while run:
-        clock.tick(FPS)
-        current_time = time.time()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-
-            if event.type == pygame.KEYDOWN:
-                new_x, new_y = player_x, player_y
-
-                if event.key == pygame.K_ESCAPE:
-                    pause_start = time.time()
-                    action = show_pause_menu(window, moved, clock)
-                    pause_end = time.time()
-                    pause_duration += pause_end - pause_start
-                    if action == PauseMenuAction.QUIT:
-                        run = False
-                    if action == PauseMenuAction.RESTART:
-                        print(f"Score: {score}")
-                        print(f"Shadow Delay: {SHADOW_DELAY:.2f}s")
-                        return True
-                    continue
-                elif event.key in {pygame.K_LEFT, pygame.K_a, pygame.K_j}:
-                    new_x -= player_speed
-                elif event.key in {pygame.K_RIGHT, pygame.K_d, pygame.K_l}:
-                    new_x += player_speed
-                elif event.key in {pygame.K_UP, pygame.K_w, pygame.K_i}:
-                    new_y -= player_speed
-                elif event.key in {pygame.K_DOWN, pygame.K_s, pygame.K_k}:
-                    new_y += player_speed
-                else:
-                    continue
-                
-                # Check if the new position is valid
-                if maze_manager.get_cell(new_x, new_y) != 1:
-                    if not moved:
-                        moved = True
-                        pygame.mixer.music.play(-1)
-                    # Record the movement
-                    movement_history.append({
-                        "position": (new_x, new_y),
-                        "time": current_time
-                    })
-                    player_x, player_y = new_x, new_y
-
-        for entry in movement_history:
-            entry["time"] += pause_duration
-        pause_duration = 0
-
-        # Update shadow position based on movement history
-        while movement_history and current_time - movement_history[0]["time"] >= SHADOW_DELAY:
-            shadow_move = movement_history.popleft()
-            shadow_x, shadow_y = shadow_move["position"]
-
-        # Update camera position to follow player smoothly
-        target_camera_y = player_y - HEIGHT // 2
-        camera_y += (target_camera_y - camera_y) * 0.1
-
-        # Draw background
-        window.fill(GRAY)
-
-        # Calculate visible range
-        visible_sections = set([
-            maze_manager.get_current_grid_position(player_y - HEIGHT),
-            maze_manager.get_current_grid_position(player_y),
-            maze_manager.get_current_grid_position(player_y + HEIGHT)
-        ])
-
-        # Draw visible maze sections
-        for section in visible_sections:
-            maze_manager.ensure_section_exists(section)
-            base_y = section * maze_manager.section_height * GRID_SIZE
-            
-            for y in range(maze_manager.section_height):
-                for x in range(maze_manager.width):
-                    absolute_y = base_y + y * GRID_SIZE
-                    cell = maze_manager.get_cell(x * GRID_SIZE, absolute_y)
-                    
-                    screen_x = x * GRID_SIZE
-                    screen_y = absolute_y - int(camera_y)
-                    
-                    if -GRID_SIZE <= screen_y <= HEIGHT:
-                        if cell == 1: # wall
-                            pygame.draw.rect(window, BROWN, (screen_x, screen_y, GRID_SIZE, GRID_SIZE))
-                        else: # path
-                            pygame.draw.rect(window, GRAY, (screen_x, screen_y, GRID_SIZE, GRID_SIZE))
-                        
-                        # grid lines
-                        pygame.draw.rect(window, BLACK, (screen_x, screen_y, GRID_SIZE, GRID_SIZE), 1)
-
-        # Draw shadow (only if movement history exists)
-        if movement_history:
-            window.blit(SHADOW, (shadow_x, shadow_y - camera_y))
-
-        # Draw character
-        window.blit(CHARACTER, (player_x, player_y - camera_y))
-
-        # score (height reached)
-        score = abs(player_y // GRID_SIZE - 13)
-        if score > 0:
-            pygame.display.set_caption(f"Score: {score} - FPS: {int(clock.get_fps())}")
+        app.tick_clock.tick(wake_rate)
+        if frame_started:
+            profiler.skip() # the wait for this tick is not part of the frame
         else:
-            pygame.display.set_caption(f"{WINDOW_TITLE} - FPS: {int(clock.get_fps())}")
-
-        # Calculate how many multiples of 20 the score has reached
-        delay_reduction = (score // 20) * 0.05
-        # New delay, ensuring it does not drop below 0
-        SHADOW_DELAY = max(0.5, SHADOW_DELAY_INIT - delay_reduction)
+            profiler.begin_frame()
+            frame_started = True
+        now = time.perf_counter()
+        accumulator = min(accumulator + now - last_time, MAX_FRAME_TIME)
+        last_time = now
+
+        while run and accumulator >= tick:
+            accumulator -= tick
+            ticks += 1
+            sim_time = ticks * tick
+            if recorder:
+                recorder.frame(sim_time)
+
+            # Input is handled every tick, not once per rendered frame
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+                if event.type == pygame.VIDEORESIZE:
+                    app.resize()
+
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        action = await show_pause_menu(app, state.moved)
+                        # Paused time never reaches the simulation clock, so the shadow delay needs no correction
+                        last_time = time.perf_counter()
+                        profiler.discard_frame()
+                        renderer.invalidate()
+                        if action == PauseMenuAction.QUIT:
+                            run = False
+                        if action == PauseMenuAction.RESTART:
+                            if recorder:
+                                recorder.finish(state.score, interrupted=True)
+                            print(f"Score: {state.score}")
+                            print(f"Shadow Delay: {state.shadow_delay:.2f}s")
+                            return True
+                        continue
+                    if event.key == pygame.K_F3:
+                        profiler.show_overlay = not profiler.show_overlay
+                        renderer.invalidate()
+                        continue
+                    if event.key == pygame.K_F4:
+                        names = list(RENDERERS)
+                        app.set_renderer(names[(names.index(app.renderer_name) + 1) % len(names)])
+                        renderer = app.renderer
+                        print(f"Renderer: {app.renderer_name}")
+                        continue
+                    if event.key not in MOVE_KEYS:
+                        continue
+
+                    if recorder:
+                        recorder.move(*MOVE_KEYS[event.key])
+                    first_move = not state.moved
+                    if state.move(*MOVE_KEYS[event.key], sim_time) and first_move:
+                        play_music()
+
+            profiler.mark("events")
+
+            # Update shadow position, score and shadow delay
+            caught = state.update(sim_time)
+            previous_camera_y = camera_y
+            camera_y = update_camera(camera_y, state.player_y, tick)
+            profiler.mark("shadow")
+            if caught:
+                break
+
+        # Half a tick of slack, so a wake-up that comes in a little early still draws its frame
+        if not caught and now < next_frame - tick / 2:
+            await asyncio.sleep(0)
+            continue
+        next_frame = max(next_frame + frame_interval, now - tick / 2)
+        frame_started = False
+        clock.tick()
+
+        # Draw the camera between the last two ticks, by how far the clock is into the next one
+        draw_camera_y = previous_camera_y + (camera_y - previous_camera_y) * (accumulator / tick)
+        if profiler.show_overlay:
+            renderer.invalidate() # the overlay is drawn over the maze every frame
+        changed = renderer.draw(app.screen, maze_manager, state, draw_camera_y)
+        changed = app.present(changed)
+        profiler.mark("present") # scaling the frame into the window
+
+        # score (height reached), in the caption or the window; both only change when the values do.
+        # Text goes on the window after the frame is scaled, so it stays sharp at any frame resolution
+        score = state.score
+        app.hud.update(score, app.get_fps())
+        changed = app.hud.draw(app.window, renderer if app.screen is app.window else None, changed)
+        profiler.draw_overlay(app.window, get_font(16), WHITE)
+        profiler.mark("hud")
 
         # Check for collision between shadow and player
-        if shadow_x == player_x and shadow_y == player_y and moved:
-            restart = show_game_over_screen(window, score, SHADOW_DELAY, clock) # returns whether player wants to restart
+        if caught:
+            if recorder:
+                recorder.finish(score, recorder.frames - 1)
+            restart = await show_game_over_screen(app, score, state.shadow_delay) # returns whether player wants to restart
             print(f"Score: {score}")
-            print(f"Shadow Delay: {SHADOW_DELAY:.2f}s")
+            print(f"Shadow Delay: {state.shadow_delay:.2f}s")
             return restart
 
         if run:
-            pygame.display.flip()
+            if changed is None:
+                pygame.display.flip()
+            elif changed:
+                pygame.display.update(changed)
+            app.mark_startup("first frame")
+        profiler.mark("flip")
+
+        # Build the sections ahead of the player a slice at a time, so crossing into them never stalls a frame
+        maze_manager.advance_generation(GENERATION_BUDGET)
+        profiler.mark("generation")
+        profiler.end_frame()
+        if not FPS and changed == [] and sys.platform != "emscripten":
+            # Uncapped but nothing changed on screen: wait for the next tick instead of spinning
+            time.sleep(max(0.0, tick - accumulator - (time.perf_counter() - now)))
         await asyncio.sleep(0)
-    print(f"Score: {score}")
-    print(f"Shadow Delay: {SHADOW_DELAY:.2f}s")
+    if recorder:
+        recorder.finish(state.score)
+    print(f"Score: {state.score}")
+    print(f"Shadow Delay: {state.shadow_delay:.2f}s")
 
-if __name__ == "__main__":
+async def run_session(app):
+    ### Play runs back to back in one event loop, the window, assets and renderer stay alive between them
     restart = True
     game = 0
     while restart:
         game += 1
-        restart = asyncio.run(main(game))
+        restart = await main(app, game)
+
+if __name__ == "__main__":
+    app = App()
+    asyncio.run(run_session(app))
+    app.profiler.close()
     pygame.quit()
     sys.exit()
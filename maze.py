@@ -0,0 +1,581 @@
+##### MAZE #####
+# Importable without a display: sections are plain NumPy grids, surfaces are only rendered when drawn
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import pygame
+import numpy as np
+import random
+import time
+from collections import OrderedDict
+from settings import GRID_SIZE, GRID_LINES, BROWN, BLACK, GRAY, MAZE_GENERATOR, MAZE_SEED, MAX_RESIDENT_SECTIONS
+from section_store import SectionStore
+
+# Resumable jobs are generators that yield between small slices of work and return their result
+STEPS_PER_SLICE = 64 # DFS steps between two yields
+
+def run_steps(job):
+    ### Drive a resumable job to completion and return its result
+    while True:
+        try:
+            next(job)
+        except StopIteration as done:
+            return done.value
+
+class MazeManager:
+    def __init__(self, width, height, generator=MAZE_GENERATOR, seed=MAZE_SEED, max_sections=MAX_RESIDENT_SECTIONS,
+                 minimum_paths=5, prefetch=0, pack=None, generate=True):
+        # A maze pack (maze_pack.MazePack) fixes the generator, seed and boundary paths: its sections are loaded
+        # instead of generated, and the sections beyond it must line up with them
+        self.pack = pack
+        if pack is not None:
+            generator, seed, minimum_paths = pack.generator, pack.seed, pack.minimum_paths
+        self.width = width // GRID_SIZE
+        self.section_height = height // GRID_SIZE
+        self.current_section = 0
+        self.maze_sections = OrderedDict() # least recently used first
+        self.section_surfaces = {} # pre-rendered surfaces of resident sections, rendered on first draw
+        self.repairs = 0 # bumped whenever a resident section is re-carved, so renderers know to redraw it
+        self.max_sections = max(3, max_sections) # the player's section and its two neighbors must stay resident
+        self.vertical_paths = set()
+        self.minimum_paths = minimum_paths # open columns on every section boundary
+        self.generator = generator
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.lattice_templates = {} # grid shape -> padded lattice mask used by carve_flat_path
+        if pack is not None and (pack.width, pack.section_height) != (self.width, self.section_height):
+            raise ValueError(f"maze pack sections are {pack.width}x{pack.section_height} cells, "
+                             f"this maze needs {self.width}x{self.section_height}")
+        self.store = SectionStore((self.section_height, self.width)) # evicted sections, bit-packed on disk
+        # Sections beyond the resident neighbors (in both directions) built ahead of time by advance_generation,
+        # together with their surfaces; 0 builds every section when it is first needed
+        self.prefetch = prefetch
+        self.jobs = OrderedDict() # section -> resumable build, nearest to the player first
+        self.prefetched = {} # section -> grid built ahead of time, not resident yet
+        # generate=False leaves the first sections to iter_start, so they can be built between frames of another screen
+        if generate:
+            self.generate_initial_sections()
+            if prefetch:
+                self.schedule_prefetch(0)
+    
+    def section_rng(self, section_number, stream):
+        ### Independent random stream for one section, derived only from the run seed
+        return random.Random(f"{self.seed}:{stream}:{section_number}")
+
+    def get_boundary_points(self, boundary):
+        ### Open columns between section boundary-1 (its exits) and section boundary (its entries), depends only on the seed
+        columns = range(1, self.width-1, 2)
+        rng = self.section_rng(boundary, "boundary")
+        points = set(rng.sample(columns, self.minimum_paths))
+        
+        # Ensure at least one point is near each point of the boundary above for better vertical progression
+        above = self.section_rng(boundary - 1, "boundary").sample(columns, self.minimum_paths)
+        for entry in above:
+            nearby_range = range(max(1, entry - 2), min(self.width - 1, entry + 3), 2)
+            if not any(x in points for x in nearby_range):
+                points.add(rng.choice(list(nearby_range)))
+        return points
+
+    def get_neighbors(self, x, y, grid, rng=random):
+        ### Get valid neighboring cells for maze generation
+        directions = [(0, 2), (2, 0), (0, -2), (-2, 0)]
+        neighbors = []
+        for dx, dy in directions:
+            new_x, new_y = x + dx, y + dy
+            if (0 < new_x < len(grid[0]) - 1 and 
+                0 < new_y < len(grid) - 1 and 
+                grid[new_y][new_x] == 1):
+                neighbors.append((new_x, new_y, dx, dy))
+        rng.shuffle(neighbors)
+        return neighbors
+    
+    def carve_path(self, grid, start_x, start_y, entry_points=None, exit_points=None, rng=random):
+        ### Generate maze paths using modified DFS with guaranteed connectivity
+        stack = [(start_x, start_y)]
+        grid[start_y][start_x] = 0
+        
+        # Ensure entry points are open
+        if entry_points:
+            for x in entry_points:
+                grid[0][x] = 0
+                grid[1][x] = 0
+        
+        # Ensure exit points are open
+        if exit_points:
+            for x in exit_points:
+                grid[-1][x] = 0
+                grid[-2][x] = 0
+        
+        while stack:
+            current = stack[-1]
+            neighbors = self.get_neighbors(current[0], current[1], grid, rng)
+            
+            if not neighbors:
+                stack.pop()
+                continue
+            
+            next_x, next_y, dx, dy = neighbors[0]
+            # Carve passage
+            grid[current[1] + dy//2][current[0] + dx//2] = 0
+            grid[next_y][next_x] = 0
+            stack.append((next_x, next_y))
+        
+        return grid
+
+    def ensure_vertical_connectivity(self, grid, section_number):
+        ### Ensure vertical connectivity between sections with multiple guaranteed paths
+        # Entry points are shared with the exits of the section above, exit points with the entries of the section below
+        entry_points = self.get_boundary_points(section_number)
+        exit_points = self.get_boundary_points(section_number + 1)
+        
+        # Create wider passages
+        for x in entry_points:
+            grid[0][x] = 0
+            grid[1][x] = 0
+            if x > 1: # add side passages
+                grid[1][x-1] = 0
+            if x < len(grid[0])-2:
+                grid[1][x+1] = 0
+        
+        for x in exit_points:
+            grid[-1][x] = 0
+            grid[-2][x] = 0
+            if x > 1: # add side passages
+                grid[-2][x-1] = 0
+            if x < len(grid[0])-2:
+                grid[-2][x+1] = 0
+        
+        return grid, entry_points, exit_points
+
+    def carve_flat_path(self, grid, start_x, start_y, rng=random):
+        ### Carve a perfect maze over the odd-coordinate lattice with one iterative DFS using flat index arithmetic
+        return run_steps(self.iter_carve_flat_path(grid, start_x, start_y, rng))
+
+    def iter_carve_flat_path(self, grid, start_x, start_y, rng=random):
+        ### Resumable carve_flat_path, yields every STEPS_PER_SLICE carved cells
+        height, width = grid.shape
+        stride = width + 4 # two cells of padding on each side keep every neighbor index in bounds
+        # Only interior cells with odd coordinates are maze rooms, everything else counts as visited
+        if grid.shape not in self.lattice_templates:
+            lattice = np.zeros((height + 4, stride), dtype=np.uint8)
+            lattice[3:height + 1:2, 3:width + 1:2] = 1
+            self.lattice_templates[grid.shape] = lattice.tobytes()
+        unvisited = bytearray(self.lattice_templates[grid.shape])
+        padded = np.ones((height + 4, stride), dtype=np.uint8)
+        padded[2:-2, 2:-2] = grid
+        cells = bytearray(padded.tobytes())
+        offsets = (2, -2, 2 * stride, -2 * stride)
+        choose = rng.random
+
+        current = (start_y + 2) * stride + start_x + 2
+        unvisited[current] = 0
+        cells[current] = 0
+        stack = [current]
+        steps = 0
+        while True:
+            neighbors = [offset for offset in offsets if unvisited[current + offset]]
+            
+            if not neighbors:
+                stack.pop()
+                if not stack:
+                    break
+                current = stack[-1]
+                continue
+            
+            offset = neighbors[int(choose() * len(neighbors))] if len(neighbors) > 1 else neighbors[0]
+            next_cell = current + offset
+            # Carve passage
+            cells[current + (offset >> 1)] = 0
+            cells[next_cell] = 0
+            unvisited[next_cell] = 0
+            stack.append(next_cell)
+            current = next_cell
+            steps += 1
+            if steps % STEPS_PER_SLICE == 0:
+                yield
+        
+        grid[:] = np.frombuffer(cells, dtype=np.uint8).reshape(height + 4, stride)[2:-2, 2:-2]
+        return grid
+
+    def add_extra_passages_flat(self, grid, rng=random):
+        ### Vectorized add_extra_passages: open random walls that join at least two existing paths
+        return run_steps(self.iter_add_extra_passages_flat(grid, rng))
+
+    def iter_add_extra_passages_flat(self, grid, rng=random):
+        ### Resumable add_extra_passages_flat, yields every STEPS_PER_SLICE drawn coordinates
+        height, width = grid.shape
+        count = width // 2
+        xs = np.empty(count, dtype=np.intp)
+        ys = np.empty(count, dtype=np.intp)
+        # Every x is drawn before any y, as the unsliced version did, so seeded mazes stay the same
+        for coordinates, high in ((xs, width - 2), (ys, height - 2)):
+            for index in range(count):
+                coordinates[index] = rng.randint(1, high)
+                if (index + 1) % STEPS_PER_SLICE == 0:
+                    yield
+        
+        paths = (grid == 0).astype(np.uint8)
+        path_count = np.zeros(grid.shape, dtype=np.uint8)
+        path_count[1:-1, 1:-1] = paths[1:-1, :-2] + paths[1:-1, 2:] + paths[:-2, 1:-1] + paths[2:, 1:-1]
+        
+        connects = (grid[ys, xs] == 1) & (path_count[ys, xs] >= 2)
+        grid[ys[connects], xs[connects]] = 0
+        return grid
+
+    def iter_generate_flat_maze_section(self, section_number, rng):
+        ### Generate a maze section on a compact uint8 grid with a single DFS pass (resumable)
+        grid = np.ones((self.section_height, self.width), dtype=np.uint8)
+        
+        # Get entry/exit points
+        grid, entry_points, exit_points = self.ensure_vertical_connectivity(grid, section_number)
+        
+        # One DFS visits every lattice cell, so all entry and exit points end up connected
+        yield from self.iter_carve_flat_path(grid, min(entry_points), 1, rng)
+        
+        # Cheap check that repairs the section if any point was left out
+        yield
+        yield from self.iter_connect_all_points(grid, entry_points, exit_points)
+        
+        # Add some random extra passages for variety
+        yield from self.iter_add_extra_passages_flat(grid, rng)
+        
+        return grid, entry_points, exit_points
+
+    def generate_maze_section(self, section_number):
+        ### Generate a maze section with the selected generator, returns (grid, entry_points, exit_points)
+        return run_steps(self.iter_generate_maze_section(section_number))
+
+    def iter_generate_maze_section(self, section_number):
+        ### Resumable generate_maze_section
+        # The result only depends on the seed and section number, however it is sliced
+        rng = self.section_rng(section_number, "maze")
+        if self.generator == "flat":
+            return (yield from self.iter_generate_flat_maze_section(section_number, rng))
+        return (yield from self.iter_generate_classic_maze_section(section_number, rng))
+
+    def iter_generate_classic_maze_section(self, section_number, rng):
+        ### Generate a new maze section with guaranteed paths (resumable between DFS runs)
+        grid = np.ones((self.section_height, self.width), dtype=int)
+        
+        # Get entry/exit points
+        grid, entry_points, exit_points = self.ensure_vertical_connectivity(grid, section_number)
+        
+        # Generate the maze paths starting from multiple points (sorted so the seeded result is reproducible)
+        for start_x in sorted(entry_points):
+            grid = self.carve_path(grid, start_x, 1, entry_points, exit_points, rng)
+            yield
+        
+        # Additional path generation from exit points upward
+        for end_x in sorted(exit_points):
+            grid = self.carve_path(grid, end_x, self.section_height - 2, entry_points, exit_points, rng)
+            yield
+        
+        # Ensure all points are connected
+        yield from self.iter_connect_all_points(grid, entry_points, exit_points)
+        yield
+        
+        # Add some random extra passages for variety
+        self.add_extra_passages(grid, rng)
+        
+        return grid, entry_points, exit_points
+    
+    def flatten_grid(self, grid):
+        ### Copy a grid into a flat bytearray padded with walls so neighbor indices never leave the buffer
+        height, width = grid.shape
+        stride = width + 1 # one wall column on the right also stops rows from wrapping into each other
+        padded = np.ones((height + 2, stride), dtype=np.uint8)
+        padded[1:-1, :-1] = grid
+        return bytearray(padded.tobytes()), stride
+
+    def flood_open_cells(self, cells, stride, sources):
+        ### Mark every open cell connected to the given flat indices with one BFS
+        return run_steps(self.iter_flood_open_cells(cells, stride, sources))
+
+    def iter_flood_open_cells(self, cells, stride, sources):
+        ### Resumable flood_open_cells, yields every STEPS_PER_SLICE visited cells
+        reached = bytearray(len(cells))
+        frontier = [source for source in sources if not cells[source]]
+        for source in frontier:
+            reached[source] = 1
+        offsets = (1, -1, stride, -stride)
+        for index, current in enumerate(frontier): # the list grows while it is walked, so this is a plain BFS
+            for offset in offsets:
+                next_cell = current + offset
+                if not cells[next_cell] and not reached[next_cell]:
+                    reached[next_cell] = 1
+                    frontier.append(next_cell)
+            if (index + 1) % STEPS_PER_SLICE == 0:
+                yield
+        return reached
+
+    def get_terminals(self, grid, stride, entry_points, exit_points):
+        ### Flat indices of the entry cells (top row) and exit cells (bottom row) of a flattened grid
+        height = grid.shape[0]
+        entries = [stride + x for x in sorted(entry_points)]
+        exits = [height * stride + x for x in sorted(exit_points)]
+        return entries, exits
+
+    def has_route(self, grid, entry_points, exit_points):
+        ### Check that at least one exit point can be reached from the entry points
+        cells, stride = self.flatten_grid(grid)
+        entries, exits = self.get_terminals(grid, stride, entry_points, exit_points)
+        reached = self.flood_open_cells(cells, stride, entries)
+        return any(reached[exit] for exit in exits)
+
+    def connect_all_points(self, grid, entry_points, exit_points):
+        ### Ensure all entry and exit points are connected to the maze, returns whether anything had to be carved
+        return run_steps(self.iter_connect_all_points(grid, entry_points, exit_points))
+
+    def iter_connect_all_points(self, grid, entry_points, exit_points):
+        ### Resumable connect_all_points, yields every STEPS_PER_SLICE searched cells and after every repaired point
+        height, width = grid.shape
+        cells, stride = self.flatten_grid(grid)
+        entries, exits = self.get_terminals(grid, stride, entry_points, exit_points)
+        terminals = entries + exits
+        
+        # The network is everything already connected to the first entry point
+        network = yield from self.iter_flood_open_cells(cells, stride, terminals[:1])
+        missing = [terminal for terminal in terminals if not network[terminal]]
+        if not missing:
+            return False
+        
+        # Walls can be carved anywhere inside the border, plus the entry/exit cells themselves
+        carvable = np.zeros((height + 2, stride), dtype=np.uint8)
+        carvable[2:-2, 1:-2] = 1
+        carvable = bytearray(carvable.tobytes())
+        for terminal in terminals:
+            carvable[terminal] = 1
+        
+        # One multi-source BFS from the whole network, parent pointers lead every missing point back along a shortest tunnel
+        parent = [-1] * len(cells)
+        frontier = [cell for cell, connected in enumerate(network) if connected]
+        for cell in frontier:
+            parent[cell] = cell
+        offsets = (1, -1, stride, -stride)
+        for index, current in enumerate(frontier):
+            for offset in offsets:
+                next_cell = current + offset
+                if carvable[next_cell] and parent[next_cell] == -1:
+                    parent[next_cell] = current
+                    frontier.append(next_cell)
+            if (index + 1) % STEPS_PER_SLICE == 0:
+                yield
+        
+        for terminal in missing:
+            cell = terminal
+            while not network[cell]: # stops early where an earlier tunnel already joined the network
+                cells[cell] = 0
+                network[cell] = 1
+                cell = parent[cell]
+            yield
+        
+        grid[:] = np.frombuffer(cells, dtype=np.uint8).reshape(height + 2, stride)[1:-1, :-1]
+        return True
+
+    def check_section_pair(self, upper_section):
+        ### Check that a resident section and the one below it have an entry-to-exit route together, repairing them if not
+        upper = self.maze_sections[upper_section]
+        lower = self.maze_sections[upper_section + 1]
+        pair = np.vstack((upper, lower))
+        entry_points = self.get_boundary_points(upper_section)
+        exit_points = self.get_boundary_points(upper_section + 2)
+        if self.has_route(pair, entry_points, exit_points):
+            return True
+        
+        # Carve the missing connection across both sections, their surfaces are re-rendered on the next draw
+        self.connect_all_points(pair, entry_points, exit_points)
+        for section, grid in ((upper_section, pair[:len(upper)]), (upper_section + 1, pair[len(upper):])):
+            self.maze_sections[section][:] = grid
+            self.section_surfaces.pop(section, None)
+        self.repairs += 1
+        return False
+
+    def render_section(self, grid):
+        ### Rasterize a section grid (walls, paths and grid lines) once so it can be blitted every frame
+        return run_steps(self.iter_render_section(grid))
+
+    def iter_render_section(self, grid):
+        ### Resumable render_section, yields after every row of cells
+        surface = pygame.Surface((self.width * GRID_SIZE, self.section_height * GRID_SIZE))
+        surface.fill(GRAY)
+        for y in range(self.section_height):
+            for x in range(self.width):
+                cell_rect = (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+                if grid[y][x] == 1: # wall
+                    pygame.draw.rect(surface, BROWN, cell_rect)
+                # grid lines
+                if GRID_LINES:
+                    pygame.draw.rect(surface, BLACK, cell_rect, 1)
+            yield
+        return surface
+
+    def get_section_surface(self, section):
+        ### Pre-rendered surface of a resident section, rasterized the first time it is drawn
+        if section not in self.section_surfaces:
+            self.section_surfaces[section] = self.render_section(self.maze_sections[section])
+        return self.section_surfaces[section]
+
+    def add_section(self, section):
+        ### Load a section (from the prefetched builds, then the store if it was visited before and the pack, otherwise
+        ### generate it) and spill the least recently used ones
+        job = self.jobs.pop(section, None)
+        if section in self.prefetched:
+            grid = self.prefetched.pop(section) # its surface, if already rendered, stays with the section
+        elif section in self.store:
+            grid = self.store.get(section)
+        elif self.pack is not None and section in self.pack:
+            grid = self.pack.get(section)
+        elif job is not None:
+            grid = run_steps(job) # the player outran the pre-generation: finish this build now
+            self.prefetched.pop(section)
+        else:
+            grid, _, _ = self.generate_maze_section(section)
+            grid = grid.astype(np.uint8, copy=False)
+        self.maze_sections[section] = grid
+        while len(self.maze_sections) > self.max_sections:
+            old_section, old_grid = self.maze_sections.popitem(last=False)
+            self.store.put(old_section, old_grid)
+            self.section_surfaces.pop(old_section, None)
+        
+        # Make sure the new section also connects through its resident neighbors
+        for upper_section in (section - 1, section):
+            if upper_section in self.maze_sections and upper_section + 1 in self.maze_sections:
+                self.check_section_pair(upper_section)
+
+    def iter_build_section(self, section):
+        ### Resumable build of a section ahead of the player: its grid (unless it was stored or the pack has it),
+        ### then its surface
+        if section in self.store:
+            grid = self.store.get(section) # visited before, only the surface is missing
+        elif self.pack is not None and section in self.pack:
+            grid = self.pack.get(section)
+        else:
+            grid, _, _ = yield from self.iter_generate_maze_section(section)
+            grid = grid.astype(np.uint8, copy=False)
+        self.prefetched[section] = grid
+        self.section_surfaces[section] = yield from self.iter_render_section(grid)
+        return grid
+
+    def schedule_prefetch(self, section):
+        ### Queue builds of a section's neighbors that are not resident yet (at the start of a run) and of the sections
+        ### just beyond them, and drop the ones left behind
+        wanted = []
+        for distance in range(1, 2 + self.prefetch):
+            wanted += [section - distance, section + distance] # upwards (where the score is) first
+        for old in [old for old in self.jobs if old not in wanted]:
+            del self.jobs[old]
+        for old in [old for old in self.prefetched if old not in wanted]:
+            del self.prefetched[old]
+            self.section_surfaces.pop(old, None)
+        for new in wanted:
+            if new not in self.maze_sections and new not in self.prefetched and new not in self.jobs:
+                self.jobs[new] = self.iter_build_section(new)
+
+    def advance_generation(self, budget):
+        ### Run queued section builds for up to budget seconds, returns whether work is left
+        deadline = time.perf_counter() + budget
+        while self.jobs:
+            section, job = next(iter(self.jobs.items()))
+            try:
+                while time.perf_counter() < deadline:
+                    next(job)
+                return True
+            except StopIteration:
+                del self.jobs[section]
+        return False
+
+    def generate_initial_sections(self):
+        ### Generate initial maze sections
+        self.add_section(0)
+        self.add_section(1)
+    
+    def iter_start(self):
+        ### Resumable start for a MazeManager created with generate=False: the first sections and section -1 (which
+        ### the first move makes resident) with their surfaces, so neither the first frame nor the first move has
+        ### anything left to build (the prefetched ones are queued for advance_generation)
+        for section in (0, 1, -1):
+            yield from self.iter_build_section(section)
+        self.generate_initial_sections() # takes the sections just built
+        self.add_section(-1)
+        if self.prefetch:
+            self.schedule_prefetch(0)
+
+    def memory_stats(self):
+        ### Bytes held by resident sections (grids and surfaces) and by the section store
+        stats = {
+            "resident_sections": len(self.maze_sections),
+            "resident_grid_bytes": sum(grid.nbytes for grid in self.maze_sections.values()),
+            "surface_bytes": sum(surface.get_pitch() * surface.get_height() for surface in self.section_surfaces.values()),
+        }
+        stats.update(self.store.stats())
+        return stats
+
+    def get_current_grid_position(self, pixel_y):
+        ### Convert pixel Y position to grid coordinates and section number
+        section = pixel_y // (self.section_height * GRID_SIZE)
+        return section
+    
+    def ensure_section_exists(self, section):
+        ### Ensure that the required maze section exists and mark it as recently used
+        if section in self.maze_sections:
+            self.maze_sections.move_to_end(section)
+        else:
+            self.add_section(section)
+
+    def update_sections(self, pixel_y):
+        ### Manage sections around a pixel Y position (run once per frame or player move, not per cell)
+        section = self.get_current_grid_position(pixel_y)
+        self.current_section = section
+        for nearby in (section - 1, section + 1, section):
+            self.ensure_section_exists(nearby)
+        if self.prefetch:
+            self.schedule_prefetch(section)
+
+    def get_cell(self, pixel_x, pixel_y):
+        ### Get the value of a cell at the given pixel coordinates (read only, unloaded cells count as walls)
+        grid_x = pixel_x // GRID_SIZE
+        if not 0 <= grid_x < self.width:
+            return 1
+        grid_y = pixel_y // GRID_SIZE
+        grid = self.maze_sections.get(grid_y // self.section_height)
+        if grid is None:
+            return 1
+        return grid[grid_y % self.section_height, grid_x]
+
+    def get_cells(self, pixel_x, pixel_y, pixel_width, pixel_height, fill=1):
+        ### Get a window of cell values covering the given pixel range in one call (unloaded cells are set to fill, walls by default)
+        first_x = pixel_x // GRID_SIZE
+        first_y = pixel_y // GRID_SIZE
+        last_x = -(-(pixel_x + pixel_width) // GRID_SIZE) # ceil division so partially covered cells are included
+        last_y = -(-(pixel_y + pixel_height) // GRID_SIZE)
+        cells = np.full((last_y - first_y, last_x - first_x), fill, dtype=np.uint8)
+        
+        # Columns of the window that are inside the maze
+        src_x0, src_x1 = max(first_x, 0), min(last_x, self.width)
+        if src_x0 >= src_x1:
+            return cells
+        
+        # Copy the overlapping rows of each resident section
+        for section in range(first_y // self.section_height, (last_y - 1) // self.section_height + 1):
+            grid = self.maze_sections.get(section)
+            if grid is None:
+                continue
+            section_top = section * self.section_height
+            src_y0 = max(first_y, section_top)
+            src_y1 = min(last_y, section_top + self.section_height)
+            cells[src_y0 - first_y:src_y1 - first_y, src_x0 - first_x:src_x1 - first_x] = \
+                grid[src_y0 - section_top:src_y1 - section_top, src_x0:src_x1]
+        return cells
+    
+    def add_extra_passages(self, grid, rng=random):
+        ### Add some random extra passages to prevent dead ends
+        for _ in range(self.width // 2):
+            x = rng.randint(1, self.width - 2)
+            y = rng.randint(1, self.section_height - 2)
+            if grid[y][x] == 1:
+                # Check if adding a passage here would connect two existing paths
+                neighbors = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
+                path_count = sum(1 for nx, ny in neighbors if 0 <= nx < self.width and 
+                               0 <= ny < self.section_height and grid[ny][nx] == 0)
+                if path_count >= 2:
+                    grid[y][x] = 0
+        
+        return grid
@@ -0,0 +1,117 @@
+##### MAZE PACKS #####
+# Sections of one seed generated ahead of time across all cores, validated pair by pair and saved bit-packed,
+# so a run (or a tournament with a fixed maze) can load them instead of generating anything during play.
+# Boundary points only depend on the seed, so every section can be generated independently of the others.
+#
+# File layout (little-endian):
+#   header: magic b"SPMP", u16 version, u64 seed, u8 generator, u16 width, u16 section height (in cells),
+#           u16 minimum paths, i32 first section, u32 section count
+#   records: one np.packbits record per section, first section first
+# Usage: python maze_pack.py out.pack [--seed 0] [--sections 200] [--processes 4] [--generator flat]
+import sys
+import struct
+import time
+import numpy as np
+from collections import OrderedDict
+from maze import MazeManager
+from settings import GRID_SIZE, WIDTH, HEIGHT, MAZE_GENERATOR
+
+MAGIC = b"SPMP"
+VERSION = 1
+HEADER = struct.Struct("<4sHQBHHHiI")
+GENERATORS = ("flat", "classic")
+
+class PackError(Exception):
+    pass
+
+class MazePack:
+    ### Read-only sections of a pack file, unpacked on demand
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise PackError(f"{path} is not a maze pack")
+        magic, version, self.seed, generator, self.width, self.section_height, self.minimum_paths, self.first, self.count = \
+            HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise PackError(f"{path} is not a version {VERSION} maze pack")
+        self.generator = GENERATORS[generator]
+        self.cell_count = self.width * self.section_height
+        self.record_size = (self.cell_count + 7) // 8
+        # The browser build has no mmap, there the (small) record block is read into memory
+        if sys.platform == "emscripten":
+            self.records = np.fromfile(path, dtype=np.uint8, offset=HEADER.size).reshape(self.count, self.record_size)
+        else:
+            self.records = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size, shape=(self.count, self.record_size))
+
+    def __contains__(self, section):
+        return self.first <= section < self.first + self.count
+
+    def get(self, section):
+        ### Unpack one section into a new uint8 grid
+        cells = np.unpackbits(self.records[section - self.first], count=self.cell_count)
+        return cells.reshape(self.section_height, self.width)
+
+##### BULK GENERATION #####
+_workers = {} # (seed, generator, minimum_paths) -> MazeManager of this worker process
+
+def generate_section(job):
+    ### Generate one section in a worker process, returns its packed cells
+    seed, generator, minimum_paths, section = job
+    key = (seed, generator, minimum_paths)
+    if key not in _workers:
+        _workers[key] = MazeManager(WIDTH, HEIGHT, generator, seed, minimum_paths=minimum_paths, generate=False)
+    grid, _, _ = _workers[key].generate_maze_section(section)
+    return np.packbits(grid.reshape(-1) != 0).tobytes()
+
+def write_pack(path, seed, count, first=None, generator=MAZE_GENERATOR, minimum_paths=5, processes=None):
+    ### Generate count sections (by default the first ones a run climbs through) across a process pool and save them
+    if first is None:
+        first = 2 - count # the run starts in section 0 with section 1 below it and climbs towards negative sections
+    sections = range(first, first + count)
+    jobs = [(seed, generator, minimum_paths, section) for section in sections]
+    if processes == 1:
+        records = [generate_section(job) for job in jobs]
+    else:
+        # Imported here: the game only reads packs, and multiprocessing is slow to import and missing in the browser
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            records = list(pool.map(generate_section, jobs, chunksize=max(1, count // 64)))
+
+    # Validate every boundary in order with the game's own pair check, repairing the rare pair without a route
+    maze_manager = MazeManager(WIDTH, HEIGHT, generator, seed, minimum_paths=minimum_paths, generate=False)
+    shape = (maze_manager.section_height, maze_manager.width)
+    cell_count = shape[0] * shape[1]
+    maze_manager.maze_sections = OrderedDict(
+        (section, np.unpackbits(np.frombuffer(record, dtype=np.uint8), count=cell_count).reshape(shape))
+        for section, record in zip(sections, records))
+    repairs = 0
+    for upper_section in sections[:-1]:
+        repairs += not maze_manager.check_section_pair(upper_section)
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, seed, GENERATORS.index(generator), shape[1], shape[0],
+                               minimum_paths, first, count))
+        for section in sections:
+            file.write(np.packbits(maze_manager.maze_sections[section].reshape(-1) != 0).tobytes())
+    return {"sections": count, "first": first, "repairs": repairs, "bytes_per_section": (cell_count + 7) // 8}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pre-generate the sections of a seed into a maze pack")
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sections", type=int, default=200, help="number of sections in the pack")
+    parser.add_argument("--first", type=int, default=None, help="first section (default: the sections a run climbs through)")
+    parser.add_argument("--generator", default=MAZE_GENERATOR, choices=GENERATORS)
+    parser.add_argument("--minimum-paths", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = write_pack(args.path, args.seed, args.sections, args.first, args.generator, args.minimum_paths, args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"{result['sections']} sections ({result['first']} to {result['first'] + result['sections'] - 1}) of seed {args.seed} "
+          f"in {elapsed:.2f}s, {result['repairs']} boundaries repaired")
+    print(f"{result['bytes_per_section']} B per section, {HEADER.size + result['sections'] * result['bytes_per_section']} B in {args.path} "
+          f"(grid size {GRID_SIZE}, window {WIDTH}x{HEIGHT})")
@@ -0,0 +1,167 @@
+##### FRAME PROFILER #####
+# Times the phases of every frame, counts (and times) calls to hot functions, draws an optional overlay and
+# streams per-frame rows to CSV or JSON lines with p50/p95/p99 summaries.
+import csv
+import json
+import time
+from array import array
+from collections import deque
+
+def percentile(sorted_values, fraction):
+    ### Nearest-rank percentile of an already sorted sequence
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class FrameProfiler:
+    ### phases lists every phase the frames may mark, in column order; a phase a frame skips is exported as 0
+    def __init__(self, export_path=None, phases=(), window=600):
+        self.export_path = export_path
+        self.phases = list(phases)
+        self.recent = deque(maxlen=window) # last frames, for the overlay
+        self.totals = array("d") # every frame's work time, kept only when exporting
+        self.intervals = array("d")
+        self.phase_totals = {}
+        self.call_counts = {}
+        self.call_seconds = {}
+        self.frame = None
+        self.discarded = False
+        self.frame_count = 0
+        self.last = self.frame_start = self.previous_start = None
+        self.file = None
+        self.writer = None
+        self.columns = None
+        self.show_overlay = False
+        self.overlay_lines = []
+        self.overlay_updated = 0
+
+    def instrument(self, obj, *names):
+        ### Wrap the named methods of one object so every call is counted and timed
+        for name in names:
+            method = getattr(obj, name)
+            def counted(*args, _method=method, _name=name, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _method(*args, **kwargs)
+                finally:
+                    self.call_counts[_name] = self.call_counts.get(_name, 0) + 1
+                    self.call_seconds[_name] = self.call_seconds.get(_name, 0.0) + time.perf_counter() - start
+            setattr(obj, name, counted)
+            self.call_counts.setdefault(name, 0)
+            self.call_seconds.setdefault(name, 0.0)
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        self.previous_start, self.frame_start = self.frame_start, now
+        self.last = now
+        self.frame = {}
+        self.discarded = False
+        self.frame_calls = dict(self.call_counts)
+        self.frame_call_seconds = dict(self.call_seconds)
+
+    def mark(self, phase):
+        ### Charge the time since the previous mark to the given phase
+        now = time.perf_counter()
+        self.frame[phase] = self.frame.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def skip(self):
+        ### Leave the time since the previous mark out of the frame (e.g. waiting for the next tick)
+        self.last = time.perf_counter()
+
+    def discard_frame(self):
+        ### Leave the current frame out of the statistics (e.g. it contained the pause menu)
+        self.discarded = True
+        self.frame_start = None
+
+    def end_frame(self):
+        if self.frame is None or self.discarded:
+            return
+        total = sum(self.frame.values())
+        interval = self.frame_start - self.previous_start if self.previous_start is not None else 0.0
+        row = {"frame": self.frame_count, "interval_ms": interval * 1000, "total_ms": total * 1000}
+        for phase in self.frame:
+            if phase not in self.phases:
+                self.phases.append(phase) # JSON lines pick it up, a CSV header is fixed and write_row will refuse it
+        for phase in self.phases:
+            seconds = self.frame.get(phase, 0.0)
+            row[f"{phase}_ms"] = seconds * 1000
+            self.phase_totals[phase] = self.phase_totals.get(phase, 0.0) + seconds
+        for name, count in self.call_counts.items():
+            row[f"{name}_calls"] = count - self.frame_calls.get(name, 0)
+            row[f"{name}_ms"] = (self.call_seconds[name] - self.frame_call_seconds.get(name, 0.0)) * 1000
+        self.recent.append(row)
+        self.frame_count += 1
+        if self.export_path:
+            self.totals.append(total)
+            self.intervals.append(interval)
+            self.write_row(row)
+        self.frame = None
+
+    def write_row(self, row):
+        if self.file is None:
+            self.file = open(self.export_path, "w", newline="")
+            if self.export_path.endswith(".csv"):
+                # Built from the declared phases and instrumented calls, not from whichever phases the first frame ran
+                self.columns = ["frame", "interval_ms", "total_ms"] + [f"{phase}_ms" for phase in self.phases]
+                for name in self.call_counts:
+                    self.columns += [f"{name}_calls", f"{name}_ms"]
+                self.writer = csv.DictWriter(self.file, self.columns, restval=0)
+                self.writer.writeheader()
+        if self.writer:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+
+    def summary(self):
+        ### Frame time percentiles (whole run when exporting, otherwise the recent window) and call totals
+        if self.export_path:
+            totals, intervals = sorted(self.totals), sorted(self.intervals)
+        else:
+            totals = sorted(row["total_ms"] / 1000 for row in self.recent)
+            intervals = sorted(row["interval_ms"] / 1000 for row in self.recent)
+        return {
+            "frames": self.frame_count,
+            "frame_ms": {name: percentile(totals, fraction) * 1000
+                         for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+            "interval_ms": {name: percentile(intervals, fraction) * 1000
+                            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+            "phase_ms_per_frame": {phase: seconds * 1000 / max(1, self.frame_count)
+                                   for phase, seconds in self.phase_totals.items()},
+            "calls": dict(self.call_counts),
+            "call_ms": {name: seconds * 1000 for name, seconds in self.call_seconds.items()},
+        }
+
+    def close(self):
+        ### Finish the export: JSON lines get a summary line, CSV files get a .summary.json next to them
+        if self.file is None:
+            return
+        if self.writer:
+            with open(self.export_path + ".summary.json", "w") as file:
+                json.dump(self.summary(), file, indent=2)
+        else:
+            self.file.write(json.dumps({"summary": self.summary()}) + "\n")
+        self.file.close()
+        self.file = None
+
+    def draw_overlay(self, surface, font, color):
+        ### Draw per-phase averages of the recent frames, re-rendering the text at most twice a second
+        if not self.show_overlay or not self.recent:
+            return
+        now = time.perf_counter()
+        if now - self.overlay_updated >= 0.5:
+            self.overlay_updated = now
+            rows = list(self.recent)
+            totals = sorted(row["total_ms"] for row in rows)
+            lines = [f"frame p50 {percentile(totals, 0.5):.2f}  p95 {percentile(totals, 0.95):.2f}  p99 {percentile(totals, 0.99):.2f} ms"]
+            for key in rows[-1]:
+                if key.endswith("_ms") and key not in ("total_ms", "interval_ms"):
+                    lines.append(f"{key[:-3]}: {sum(row.get(key, 0) for row in rows) / len(rows):.3f} ms")
+            for name in self.call_counts:
+                calls = sum(row.get(f"{name}_calls", 0) for row in rows)
+                lines.append(f"{name}: {calls / len(rows):.2f} calls/frame")
+            self.overlay_lines = [font.render(line, True, color, (0, 0, 0)) for line in lines]
+        y = 5
+        for line in self.overlay_lines:
+            surface.blit(line, (5, y))
+            y += line.get_height()
@@ -0,0 +1,175 @@
+##### RENDERING #####
+# Renderers draw one frame of the maze, shadow and player and return the screen areas that changed
+# (None means the whole window, i.e. pygame.display.flip()).
+import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+import pygame
+import numpy as np
+from settings import WIDTH, HEIGHT, GRID_SIZE, GRID_LINES, CHARACTER_WIDTH, CHARACTER_HEIGHT, GRAY, BROWN, BLACK
+from assets import load_image
+
+def draw_maze(window, maze_manager, player_y, camera_y):
+    ### Draw the background and the visible maze sections
+    # Draw background
+    window.fill(GRAY)
+
+    # Calculate visible range
+    visible_sections = set([
+        maze_manager.get_current_grid_position(player_y - HEIGHT),
+        maze_manager.get_current_grid_position(player_y),
+        maze_manager.get_current_grid_position(player_y + HEIGHT)
+    ])
+
+    # Draw visible maze sections from their pre-rendered surfaces
+    for section in visible_sections:
+        if section in maze_manager.maze_sections:
+            base_y = section * maze_manager.section_height * GRID_SIZE
+            window.blit(maze_manager.get_section_surface(section), (0, base_y - int(camera_y)))
+
+def draw_sprites(window, state, camera_y):
+    ### Draw the shadows and the player
+    # Draw shadows (only if movement history exists), all in one blits call
+    if state.movement_history:
+        shadow = load_image("shadow.png", (CHARACTER_WIDTH, CHARACTER_HEIGHT))
+        window.blits([(shadow, (x, y - camera_y)) for x, y in state.shadows.positions()], doreturn=False)
+
+    # Draw character
+    window.blit(load_image("character.png", (CHARACTER_WIDTH, CHARACTER_HEIGHT)), (state.player_x, state.player_y - camera_y))
+
+class Renderer:
+    ### Base renderer: redraws the whole window every frame
+    def __init__(self):
+        self.profiler = None # set to a FrameProfiler to split the draw time into maze and sprite phases
+        self.overlays = [] # screen rects drawn over the last frame after draw() (the in-window HUD)
+        self.invalidate()
+
+    def mark(self, phase):
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
+    def invalidate(self):
+        ### Forget what is on screen (after menus, overlays or a new game) so the next frame is drawn in full
+        pass
+
+    def draw(self, window, maze_manager, state, camera_y):
+        draw_maze(window, maze_manager, state.player_y, camera_y)
+        self.mark("draw maze")
+        draw_sprites(window, state, camera_y)
+        self.mark("draw sprites")
+        return None
+
+class FullRenderer(Renderer):
+    pass
+
+class DirtyRectRenderer(Renderer):
+    ### Redraws only what changed: the sprite tiles when the camera is still, the exposed strip when it scrolls
+
+    def invalidate(self):
+        self.drawn_camera = None
+        self.drawn_sprites = None
+        self.drawn_repairs = None
+
+    def get_sprites(self, state, camera):
+        ### Screen rects of the player and the shadows (if shown) for the given camera position
+        sprites = [pygame.Rect(state.player_x, state.player_y - camera, CHARACTER_WIDTH, CHARACTER_HEIGHT)]
+        if state.movement_history:
+            for x, y in state.shadows.positions():
+                sprites.append(pygame.Rect(x, y - camera, CHARACTER_WIDTH, CHARACTER_HEIGHT))
+        return sprites
+
+    def restore(self, window, maze_manager, player_y, camera, area):
+        ### Redraw the maze inside one screen area only
+        window.set_clip(area)
+        draw_maze(window, maze_manager, player_y, camera)
+        window.set_clip(None)
+
+    def draw(self, window, maze_manager, state, camera_y):
+        camera = int(camera_y)
+        sprites = self.get_sprites(state, camera)
+        scroll = camera - self.drawn_camera if self.drawn_camera is not None else None
+
+        if scroll is None or abs(scroll) >= HEIGHT or maze_manager.repairs != self.drawn_repairs:
+            # Nothing usable on screen (or a visible section was re-carved): full redraw
+            draw_maze(window, maze_manager, state.player_y, camera)
+            self.mark("draw maze")
+            draw_sprites(window, state, camera)
+            changed = None
+        elif scroll:
+            # Shift the existing frame and only draw the newly exposed strip
+            window.scroll(0, -scroll)
+            if scroll > 0:
+                exposed = pygame.Rect(0, HEIGHT - scroll, WIDTH, scroll)
+            else:
+                exposed = pygame.Rect(0, 0, WIDTH, -scroll)
+            self.restore(window, maze_manager, state.player_y, camera, exposed)
+            # The old sprites and overlays were scrolled along with the maze
+            for old in self.drawn_sprites + self.overlays:
+                self.restore(window, maze_manager, state.player_y, camera, old.move(0, -scroll))
+            self.mark("draw maze")
+            draw_sprites(window, state, camera)
+            changed = None
+        elif sprites != self.drawn_sprites:
+            # Camera settled: only the tiles the sprites left or entered change
+            for old in self.drawn_sprites:
+                self.restore(window, maze_manager, state.player_y, camera, old)
+            self.mark("draw maze")
+            draw_sprites(window, state, camera)
+            changed = self.drawn_sprites + sprites
+        else:
+            changed = [] # idle frame, nothing to push
+
+        self.mark("draw sprites")
+        self.drawn_camera = camera
+        self.drawn_sprites = sprites
+        self.drawn_repairs = maze_manager.repairs
+        return changed
+
+class NumpyRenderer(Renderer):
+    ### Rasterizes the visible maze rows straight from the section grids with NumPy, no per-cell drawing or section surfaces
+    def __init__(self):
+        super().__init__()
+
+        # Per-column lookups, the same every frame
+        x = np.arange(WIDTH)
+        self.column_cells = x // GRID_SIZE
+        self.column_lines = ((x % GRID_SIZE == 0) | (x % GRID_SIZE == GRID_SIZE - 1)) & GRID_LINES
+
+    def invalidate(self):
+        self.palette = None # cell value (2 = not loaded) + 3 on grid lines -> window pixel, mapped for the current window
+
+    def get_palette(self, window):
+        if self.palette is None:
+            colors = (GRAY, BROWN, GRAY, BLACK, BLACK, GRAY)
+            self.palette = np.array([window.map_rgb(color) for color in colors], dtype=np.uint32)
+        return self.palette
+
+    def draw(self, window, maze_manager, state, camera_y):
+        camera = int(camera_y)
+        palette = self.get_palette(window)
+
+        # Visible cells, including the partially covered rows at the top and bottom
+        cells = maze_manager.get_cells(0, camera, WIDTH, HEIGHT, fill=2)
+        if cells.shape[1] * GRID_SIZE < WIDTH:
+            # Window wider than the maze: the columns to the right show the background
+            cells = np.hstack((cells, np.full((cells.shape[0], 1), 2, dtype=np.uint8)))
+
+        # Every cell row only has two distinct pixel rows: one crossing the cells and one on a grid line
+        columns = cells[:, np.minimum(self.column_cells, cells.shape[1] - 1)]
+        row_colors = np.empty((2, cells.shape[0], WIDTH), dtype=np.uint32)
+        np.take(palette, columns + np.uint8(3) * self.column_lines, out=row_colors[0])
+        np.take(palette, columns + np.uint8(3), out=row_colors[1])
+
+        # Pick the pixel row for every screen row and copy the rows straight into the window
+        y = np.arange(camera, camera + HEIGHT)
+        on_line = ((y % GRID_SIZE == 0) | (y % GRID_SIZE == GRID_SIZE - 1)) & GRID_LINES
+        rows = on_line * cells.shape[0] + y // GRID_SIZE - camera // GRID_SIZE
+        view = pygame.surfarray.pixels2d(window) # (x, y) view, its transpose is laid out like the rows
+        np.take(row_colors.reshape(-1, WIDTH), rows, axis=0, out=view.T)
+        del view # unlock the window before blitting
+        self.mark("draw maze")
+
+        draw_sprites(window, state, camera)
+        self.mark("draw sprites")
+        return None
+
+RENDERERS = {"full": FullRenderer, "dirty": DirtyRectRenderer, "numpy": NumpyRenderer}
@@ -0,0 +1,214 @@
+##### REPLAYS #####
+# Records a run (seed, frame timestamps and moves) into a compact binary file and plays it back
+# through the same MazeManager and GameState logic, headless or rendered, in real time or as fast as possible.
+#
+# File layout (little-endian):
+#   header: magic b"SPRP", u16 version, u64 seed, u16 grid size, u16 width, u16 height, u8 generator,
+#           then (from version 2) the maze pack the run used: i32 first section, u32 section count (0 without a pack),
+#           u16 minimum paths
+#   records, each starting with a one byte tag:
+#     b"F" f64 time      start of a frame, i.e. a simulation tick (its simulated time, used as current_time)
+#     b"M" u8 direction  move attempt during the current frame, an index into gameplay.DIRECTIONS
+#     b"P" f64 seconds   pause that ended during the current frame; legacy only, written before the game ran on
+#                        fixed ticks (paused time never reaches the simulation clock now), still played back
+#     b"E" u32 frames, u32 score, i32 game over frame (-1 if the run was quit or restarted),
+#         u8 interrupted (1 if the run was restarted from the pause menu before its last frame was simulated)
+import sys
+import struct
+import time
+from maze import MazeManager
+from gameplay import GameState, DIRECTIONS
+from settings import GRID_SIZE, WIDTH, HEIGHT, MAZE_GENERATOR
+
+MAGIC = b"SPRP"
+VERSION = 2
+HEADER = struct.Struct("<4sHQHHHB")
+PACK_INFO = struct.Struct("<iIH")
+FRAME = struct.Struct("<d")
+MOVE = struct.Struct("<B")
+PAUSE = struct.Struct("<d")
+END = struct.Struct("<IIiB")
+GENERATORS = ("flat", "classic")
+
+class ReplayError(Exception):
+    pass
+
+class ReplayRecorder:
+    ### Writes one run to a replay file as the game plays it
+    def __init__(self, path, seed, generator=MAZE_GENERATOR, pack=None):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, GRID_SIZE, WIDTH, HEIGHT, GENERATORS.index(generator)))
+        if pack is not None:
+            self.file.write(PACK_INFO.pack(pack.first, pack.count, pack.minimum_paths))
+        else:
+            self.file.write(PACK_INFO.pack(0, 0, 0))
+        self.frames = 0
+
+    def frame(self, current_time):
+        self.file.write(b"F" + FRAME.pack(current_time))
+        self.frames += 1
+
+    def move(self, dx, dy):
+        self.file.write(b"M" + MOVE.pack(DIRECTIONS.index((dx, dy))))
+
+    def finish(self, score, game_over_frame=-1, interrupted=False):
+        ### Store the outcome so a replay can check it reproduced the run, then close the file
+        self.file.write(b"E" + END.pack(self.frames, score, game_over_frame, interrupted))
+        self.file.close()
+
+def read_replay(path):
+    ### Load a replay file, returns (header dict, list of (time, actions) per frame, end dict or None)
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, seed, grid_size, width, height, generator = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ReplayError(f"{path} is not a version 1 or {VERSION} replay file")
+    header = {"seed": seed, "grid_size": grid_size, "width": width, "height": height,
+              "generator": GENERATORS[generator], "pack": None}
+    offset = HEADER.size
+    if version >= 2: # version 1 replays were never recorded with a pack
+        first, count, minimum_paths = PACK_INFO.unpack_from(data, offset)
+        offset += PACK_INFO.size
+        if count:
+            header["pack"] = {"first": first, "count": count, "minimum_paths": minimum_paths}
+
+    frames = []
+    end = None
+    while offset < len(data):
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == b"F":
+            frames.append((FRAME.unpack_from(data, offset)[0], []))
+            offset += FRAME.size
+        elif tag == b"M":
+            frames[-1][1].append(("move", DIRECTIONS[MOVE.unpack_from(data, offset)[0]]))
+            offset += MOVE.size
+        elif tag == b"P": # legacy record, see the file layout above
+            frames[-1][1].append(("pause", PAUSE.unpack_from(data, offset)[0]))
+            offset += PAUSE.size
+        elif tag == b"E":
+            frame_count, score, game_over_frame, interrupted = END.unpack_from(data, offset)
+            end = {"frames": frame_count, "score": score, "game_over_frame": game_over_frame,
+                   "interrupted": bool(interrupted)}
+            offset += END.size
+        else:
+            raise ReplayError(f"unknown record {tag!r} at byte {offset - 1} of {path}")
+    return header, frames, end
+
+def run_replay(path, render=False, realtime=False, pack=None):
+    ### Play a replay back through the game logic and return the outcome with timing statistics.
+    ### A run recorded with a maze pack needs the same pack (maze_pack.MazePack) to get the same sections.
+    header, frames, end = read_replay(path)
+    if (header["grid_size"], header["width"], header["height"]) != (GRID_SIZE, WIDTH, HEIGHT):
+        raise ReplayError("the replay was recorded with a different GRID_SIZE or window size")
+
+    recorded_pack = header["pack"]
+    if recorded_pack is not None and pack is None:
+        raise ReplayError(f"the run was played with a maze pack of {recorded_pack['count']} sections, "
+                          f"it can only be replayed with that pack")
+    if recorded_pack is None and pack is not None:
+        raise ReplayError("the run was played without a maze pack")
+    if pack is not None and ((pack.seed, pack.generator) != (header["seed"], header["generator"]) or
+                             (pack.first, pack.count, pack.minimum_paths) !=
+                             (recorded_pack["first"], recorded_pack["count"], recorded_pack["minimum_paths"])):
+        raise ReplayError("the maze pack is not the one the run was played with")
+    maze_manager = MazeManager(WIDTH, HEIGHT, header["generator"], header["seed"], pack=pack)
+    state = GameState(maze_manager)
+
+    # Time spent generating sections, measured by wrapping the generator of this MazeManager only
+    generation = {"calls": 0, "seconds": 0.0}
+    generate_maze_section = maze_manager.generate_maze_section
+    def timed_generate_maze_section(section_number):
+        start = time.perf_counter()
+        result = generate_maze_section(section_number)
+        generation["calls"] += 1
+        generation["seconds"] += time.perf_counter() - start
+        return result
+    maze_manager.generate_maze_section = timed_generate_maze_section
+
+    if render:
+        import pygame
+        import main
+        from rendering import FullRenderer
+        app = main.App()
+        renderer = FullRenderer()
+        camera_y = 0
+
+    frame_times = []
+    game_over_frame = -1
+    start = time.perf_counter()
+    for frame, (current_time, actions) in enumerate(frames):
+        if realtime:
+            # Wait until this frame is as far into the replay as it was into the recorded run
+            delay = (current_time - frames[0][0]) - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        frame_start = time.perf_counter()
+        for action, value in actions:
+            if action == "move":
+                state.move(*value, current_time)
+            else:
+                state.add_pause(value)
+        if end is not None and end["interrupted"] and frame == len(frames) - 1:
+            break # the run restarted before this frame was simulated
+        caught = state.update(current_time)
+        if render:
+            pygame.event.pump()
+            camera_y = main.update_camera(camera_y, state.player_y, current_time - frames[frame - 1][0] if frame else 0)
+            renderer.draw(app.window, maze_manager, state, camera_y)
+            pygame.display.flip()
+        frame_times.append(time.perf_counter() - frame_start)
+        if caught:
+            game_over_frame = frame
+            break
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "frames": len(frame_times),
+        "score": state.score,
+        "game_over_frame": game_over_frame,
+        "seconds": elapsed,
+        "frame_times": frame_times,
+        "generation_calls": generation["calls"],
+        "generation_seconds": generation["seconds"],
+        "maze_memory": maze_manager.memory_stats(),
+    }
+    if end is not None:
+        result["matches"] = (end["score"], end["game_over_frame"]) == (state.score, game_over_frame)
+    return result
+
+if __name__ == "__main__":
+    import argparse
+    import statistics
+    import tracemalloc
+    parser = argparse.ArgumentParser(description="Play back a recorded run")
+    parser.add_argument("path")
+    parser.add_argument("--render", action="store_true", help="draw every frame in a window")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded frame timing instead of running flat out")
+    parser.add_argument("--memory", action="store_true", help="trace Python allocations (slows the replay down)")
+    parser.add_argument("--pack", help="maze pack the run was played with")
+    args = parser.parse_args()
+
+    if args.memory:
+        tracemalloc.start()
+    pack = None
+    if args.pack is not None:
+        from maze_pack import MazePack
+        pack = MazePack(args.pack)
+    result = run_replay(args.path, args.render, args.realtime, pack)
+    frame_ms = sorted(t * 1000 for t in result["frame_times"]) or [0]
+
+    print(f"frames: {result['frames']} in {result['seconds']:.3f}s ({result['frames'] / max(result['seconds'], 1e-9):.0f} frames/s)")
+    print(f"frame time: p50 {statistics.median(frame_ms):.3f}ms, p95 {frame_ms[int(len(frame_ms) * 0.95)]:.3f}ms, max {frame_ms[-1]:.3f}ms")
+    print(f"generation: {result['generation_calls']} sections in {result['generation_seconds'] * 1000:.1f}ms")
+    if args.memory:
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"memory: {current / 1024:.0f} KiB live, {peak / 1024:.0f} KiB peak")
+        maze_memory = result["maze_memory"]
+        print(f"sections: {maze_memory['resident_sections']} resident ({maze_memory['resident_grid_bytes']} B of grids), "
+              f"{maze_memory['stored_sections']} stored at {maze_memory['bytes_per_section']} B each")
+    print(f"score: {result['score']}, game over frame: {result['game_over_frame']}")
+    if "matches" in result:
+        print("outcome matches the recording" if result["matches"] else "OUTCOME DIFFERS FROM THE RECORDING")
+        if not result["matches"]:
+            sys.exit(1)
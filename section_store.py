@@ -0,0 +1,71 @@
+##### SECTION STORE #####
+# Sections evicted from memory are bit-packed (one bit per cell) into a memory-mapped spill file indexed by section
+# number, so a player who backtracks gets the exact maze back (repairs included) without it being held in RAM.
+import sys
+import tempfile
+import numpy as np
+
+class SectionStore:
+    def __init__(self, shape, path=None, capacity=64):
+        self.shape = shape
+        self.cell_count = shape[0] * shape[1]
+        self.record_size = (self.cell_count + 7) // 8 # bytes per packed section
+        self.slots = {} # section number -> record index in the file
+        self.capacity = 0
+        self.records = None
+
+        # The browser build has no mmap, there the packed records simply stay in memory
+        self.file = None
+        if sys.platform != "emscripten":
+            self.file = open(path, "w+b") if path is not None else tempfile.TemporaryFile()
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        ### Make room for at least the given number of sections, keeping the records already stored
+        if self.file is None:
+            records = np.zeros((capacity, self.record_size), dtype=np.uint8)
+            if self.records is not None:
+                records[:self.capacity] = self.records
+        else:
+            if self.records is not None:
+                self.records.flush()
+            self.file.truncate(capacity * self.record_size)
+            records = np.memmap(self.file, dtype=np.uint8, mode="r+", shape=(capacity, self.record_size))
+        self.records = records
+        self.capacity = capacity
+
+    def __contains__(self, section):
+        return section in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def put(self, section, grid):
+        ### Store (or overwrite) the packed cells of a section
+        slot = self.slots.get(section)
+        if slot is None:
+            slot = len(self.slots)
+            if slot >= self.capacity:
+                self.grow(self.capacity * 2)
+            self.slots[section] = slot
+        self.records[slot] = np.packbits(grid.reshape(-1) != 0)
+
+    def get(self, section):
+        ### Unpack a stored section into a uint8 grid
+        cells = np.unpackbits(self.records[self.slots[section]], count=self.cell_count)
+        return cells.reshape(self.shape)
+
+    def stats(self):
+        ### Bytes used by the stored sections, per section and in total
+        return {
+            "stored_sections": len(self.slots),
+            "bytes_per_section": self.record_size,
+            "stored_bytes": len(self.slots) * self.record_size,
+            "file_bytes": self.capacity * self.record_size if self.file is not None else 0,
+        }
+
+    def close(self):
+        self.records = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
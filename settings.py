@@ -0,0 +1,57 @@
+##### CONSTANTS #####
+# Plain values only: importing this module has no side effects
+WINDOWSIZE = WIDTH, HEIGHT = 750, 750
+if WIDTH != HEIGHT:
+    min_size = min(WIDTH, HEIGHT)
+    WIDTH = min_size
+    HEIGHT = min_size
+GRID_SIZE = 50
+CHARACTER_WIDTH, CHARACTER_HEIGHT = GRID_SIZE, GRID_SIZE
+GRID_LINES = GRID_SIZE >= 4 # cell borders, smaller cells would be nothing but border
+# COLORS (RGB)
+WHITE = (255, 255, 255)
+BROWN = (128, 0, 0)
+BLACK = (0, 0, 0)
+GRAY = (142, 143, 133)
+RED = (255, 0, 0)
+# SHADOW
+SHADOW_DELAY_INIT = 1.5 # delay in seconds
+SHADOW_DELAY_INIT = max(0.5, min(3, SHADOW_DELAY_INIT))
+EXTRA_SHADOW_EVERY = 0 # hard mode: one more shadow spawns every this many points (0 = only the one shadow)
+EXTRA_SHADOW_SPACING = 0.75 # seconds each extra shadow trails the previous one on the player's path
+# BUTTONS
+COLORED_BUTTONS = True # change to False for white-on-black buttons
+# MAZE
+MAZE_GENERATOR = "flat" # "flat" (array-backed single-pass DFS) or "classic" (original per-cell DFS)
+MAZE_SEED = None # set to an int to play (or benchmark) the same maze every run
+MAX_RESIDENT_SECTIONS = 5 # sections kept in memory, least recently used ones are spilled to the section store
+PREFETCH_SECTIONS = 1 # sections built ahead of the player (each way, beyond its neighbors) a slice at a time between frames
+GENERATION_BUDGET = 0.002 # seconds per frame spent on those builds
+MAZE_PACK = None # path of a pack written by maze_pack.py: every run plays its seed and loads its sections instead of generating them
+# RENDERING
+RENDERER = "dirty" # "dirty" (only redraw what changed, scroll the rest), "full" (redraw every frame) or "numpy"
+                   # (rasterize the visible cells with NumPy every frame, for small GRID_SIZE); F4 cycles them in game
+# FPS
+FPS = 60 # frames drawn per second at most, 0 = uncapped (or the monitor's rate with VSYNC)
+VSYNC = False
+TICK_RATE = 120 # simulation ticks per second: input, shadow, score and camera update once per tick at any FPS
+MAX_FRAME_TIME = 0.25 # longest stall simulated at once, so a frozen browser tab doesn't catch up in a burst
+CAMERA_SMOOTHING = 6.3 # camera catch-up rate per second (6.3 closes 10% of the gap per 1/60 s like the original)
+IDLE_FPS = 10 # wake-ups per second of the pause and game over screens when no input arrives
+# REPLAYS
+REPLAY_DIR = None # set to a folder (e.g. "replays") to record every run for replay.py
+# PROFILING
+PROFILE_PATH = None # set to "profile.csv" or "profile.jsonl" to stream per-frame phase timings
+PROFILE_OVERLAY = False # show the frame profiler overlay at start (F3 toggles it)
+# WINDOW
+WINDOW_TITLE = "Shadow Paradox"
+# The game is drawn into a WINDOWSIZE frame that is scaled up (by a whole factor when it fits) to the window when their
+# sizes differ. For a low-resolution frame whose fill cost doesn't depend on the screen, use a few pixels per cell,
+# e.g. GRID_SIZE = 2 and WINDOWSIZE = 30, 30 with DISPLAY_SIZE = 1500, 1500 or FULLSCREEN
+DISPLAY_SIZE = WINDOWSIZE # window size in screen pixels
+RESIZABLE = False # let the player resize the window, the frame is rescaled to fit
+FULLSCREEN = False # use the whole screen at its own resolution
+# HUD
+HUD_IN_WINDOW = False # draw the score and FPS in the top left corner instead of the window caption
+HUD_FONT_SIZE = 24
+FONT = None # a .ttf/.otf file in assets/fonts, None uses the font bundled with pygame; neither scans the system fonts